@@ -0,0 +1,128 @@
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+from datetime import datetime
+from schedule_engine import CHANNEL_CONFIG, BATCH_MAX_WORKERS, get_week_starts, load_library, run_batch, write_combined_schedule
+from schedule_timeline import timeline_report
+
+# Headless batch runner. Runs any set of channels and weeks in one process with a shared
+# library index, HTTP pool and grid cache. Human-readable logs go to stderr; one JSON
+# status record per (channel, week) run and a final summary record go to stdout, or a
+# single error record and exit code 2 when the arguments or the library can't be used.
+
+# Serializes output so parallel runs don't interleave their log blocks or status records
+print_lock = threading.Lock()
+
+def emit_status(record):
+    with print_lock:
+        print(json.dumps(record), flush=True)
+
+def log(message):
+    with print_lock:
+        print(message, file=sys.stderr, flush=True)
+
+def fail(message):
+    """Ends a run that couldn't start: the error to stderr, an error record to stdout, exit code 2."""
+    log(f"Error: {message}")
+    emit_status({'event': 'error', 'message': message})
+    sys.exit(2)
+
+def report_result(result):
+    """Prints the collected log of one (channel, week) run and its status record as soon as it finishes."""
+    config = CHANNEL_CONFIG[result['channel']]
+    succeeded = result['df'] is not None and not result['df'].empty
+    log(f"\n--- {config['output_prefix']} | week of {result['week_start']} | {'Success' if succeeded else 'Failed'} ---\n" + "\n".join(result['engine'].logs))
+    emit_status({
+        'event': 'channel',
+        'channel': result['channel'],
+        'output_prefix': config['output_prefix'],
+        'week_start': result['week_start'],
+        'status': 'success' if succeeded else 'failed',
+        'rows': len(result['df']) if succeeded else 0,
+        'elapsed_seconds': round(result['elapsed_seconds'], 3)
+    })
+
+def resolve_channels(channel_args):
+    """Expands 'all' and validates channel names against CHANNEL_CONFIG."""
+    if any(name.lower() == 'all' for name in channel_args):
+        return list(CHANNEL_CONFIG.keys())
+    unknown = [name for name in channel_args if name not in CHANNEL_CONFIG]
+    if unknown:
+        raise ValueError(f"Unknown channel(s): {', '.join(unknown)}. Choose from: {', '.join(CHANNEL_CONFIG.keys())}, or 'all'.")
+    return channel_args
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate OTTera schedule sheets for any set of channels and weeks in a single run.")
+    parser.add_argument("start_date", help="Any date in the first week, e.g. 03/02/2026 or 2026-03-02.")
+    parser.add_argument("library_sheet_filepath", help="Path to the OTTera library export CSV.")
+    parser.add_argument("channels", nargs="*", default=["all"], metavar="CHANNEL",
+                        help=f"Channels to generate, or 'all' (default). One of: {', '.join(CHANNEL_CONFIG.keys())}.")
+    parser.add_argument("--end-date", help="Any date in the last week. Defaults to the start date's week.")
+    parser.add_argument("--per-week", action="store_true", help="Write one CSV per week instead of one combined CSV.")
+    parser.add_argument("--output-dir", default=os.path.join(os.path.expanduser("~"), "Downloads"))
+    parser.add_argument("--workers", type=int, default=BATCH_MAX_WORKERS, help="Number of parallel channel/week runs.")
+    args = parser.parse_args()
+
+    try:
+        channels = resolve_channels(args.channels)
+        week_starts = get_week_starts(args.start_date, args.end_date)
+    except ValueError as e:
+        fail(str(e))
+    if args.workers < 1:
+        fail(f"--workers must be at least 1, got {args.workers}.")
+
+    started = time.perf_counter()
+    try:
+        with open(args.library_sheet_filepath, encoding='utf-8') as f:
+            library_content = f.read()
+        load_library(library_content)
+    except FileNotFoundError:
+        fail(f"The file '{args.library_sheet_filepath}' was not found. Please check the path.")
+    except (OSError, UnicodeDecodeError, ValueError, KeyError) as e:
+        fail(f"Could not load the library sheet '{args.library_sheet_filepath}': {type(e).__name__}: {e}")
+    library_seconds = time.perf_counter() - started
+
+    log(f"{datetime.now().strftime('%Y-%m-%d %H:%M:%S')} | Generating {', '.join(channels)} for {len(week_starts)} week(s) starting {week_starts[0]}...")
+    results = run_batch(channels, week_starts, library_content, max_workers=args.workers, on_result=report_result)
+
+    successful = [result for result in results if result['df'] is not None and not result['df'].empty]
+    filename_prefix = "_".join(sorted(CHANNEL_CONFIG[ch]['output_prefix'] for ch in channels))
+    if args.per_week:
+        outputs = [(f"{filename_prefix}_Schedule_Sheet_{week_start}.csv", [r['df'] for r in successful if r['week_start'] == week_start]) for week_start in week_starts]
+    elif len(week_starts) > 1:
+        outputs = [(f"{filename_prefix}_Schedule_Sheet_{week_starts[0]}_to_{week_starts[-1]}.csv", [r['df'] for r in successful])]
+    else:
+        outputs = [(f"{filename_prefix}_Schedule_Sheet_{week_starts[0]}.csv", [r['df'] for r in successful])]
+
+    output_paths = []
+    if successful:
+        os.makedirs(args.output_dir, exist_ok=True)
+    for output_filename, dataframes in outputs:
+        if not dataframes:
+            continue
+        output_path = os.path.join(args.output_dir, output_filename)
+        report = timeline_report(dataframes)
+        if report:
+            log(f"\n{output_filename}:\n{report}")
+        with open(output_path, 'w', newline='', encoding='utf-8') as f:
+            write_combined_schedule(dataframes, f)
+        output_paths.append(output_path)
+        log(f"\nSchedule sheet saved to {output_path}!")
+    if not successful:
+        log("\nAll channels failed to process. No schedule sheet was created.")
+
+    emit_status({
+        'event': 'summary',
+        'succeeded': len(successful),
+        'failed': len(results) - len(successful),
+        'library_load_seconds': round(library_seconds, 3),
+        'elapsed_seconds': round(time.perf_counter() - started, 3),
+        'outputs': output_paths
+    })
+    sys.exit(0 if len(successful) == len(results) else 1)
+
+if __name__ == "__main__":
+    main()
@@ -1,48 +1,327 @@
 import os
 import sys
+import json
+import queue
+import threading
+import time
 import subprocess
 import tkinter as tk
 from tkcalendar import Calendar
 import tkinter.font as tkFont
 from tkinter import filedialog
-
-# Function to run the selected script with the input date
-def run_script(script_name, input_date_str):
+from tkinter import ttk
+
+# Output from running jobs is read on background threads and handed to the Tk main
+# thread through this queue, which poll_output() drains with root.after().
+output_queue = queue.Queue()
+active_jobs = {}
+job_counter = 0
+POLL_INTERVAL_MS = 100
+
+# Schedule scripts and the CHANNEL_CONFIG channel each one schedules. The warm worker writes
+# the script's file name and columns (schedule_worker.SCRIPT_SHEETS) from the engine's sheet.
+# For the channels in GUI_WORKER_CHANNELS, which by default are those where the engine's rows
+# match the script's, the button runs in the worker; the PLL scripts still run themselves,
+# since the engine splits and sizes some of their slots differently.
+SCRIPT_CHANNELS = {
+    'schedule_creator_acl.py': 'ACL',
+    'schedule_creator_bark.py': 'Bark',
+    'schedule_creator_billiard.py': 'Billiard',
+    'schedule_creator_pll_dom.py': 'PLL Domestic',
+    'schedule_creator_pll_int.py': 'PLL International',
+    'schedule_creator_psw.py': 'PowerSports World'
+}
+_worker_channel_names = {name.strip() for name in os.environ.get("GUI_WORKER_CHANNELS", "ACL,Bark,Billiard,PowerSports World").split(",") if name.strip()}
+WORKER_CHANNELS = {script: channel for script, channel in SCRIPT_CHANNELS.items() if channel in _worker_channel_names}
+downloads_folder = os.path.join(os.path.expanduser("~"), "Downloads")
+worker = {'process': None}
+
+# Batch runs: the channel checkboxes are filled from the worker's CHANNEL_CONFIG once it
+# is ready, and the status table shows one row per channel of the latest batch.
+batch_channel_vars = {}
+batch_state = {'job_id': None, 'rows': {}}
+BATCH_REFRESH_MS = 500
+
+def start_worker():
+    """
+    Starts the warm worker (schedule_worker.py), which keeps pandas and the engine imported
+    and the uploaded library parsed in memory, so channel runs only pay for the grid.
+    """
+    python_executable = sys.executable
+    command = [python_executable, '-u', os.path.join(os.path.dirname(__file__), 'schedule_worker.py')]
     try:
-        #python_executable = "/Users/aarongarner/Desktop/OTT-SCHEDULE-CREATOR/ott_sched_env/bin/python3"  # For Linux/macOS
-        python_executable = sys.executable
-        command = [python_executable, os.path.join(os.path.dirname(__file__), script_name), input_date_str]
-        result = subprocess.run(command, capture_output=True, text=True)
-        
-        output_text.insert(tk.END, result.stdout)  # Insert new output
-        output_text.see(tk.END)  # Auto-scroll to the bottom
-
-        if result.stderr and 'UserWarning' not in result.stderr:
-            output_text.insert(tk.END, "\n[ERROR] " + result.stderr)
-            output_text.see(tk.END)  # Auto-scroll to the bottom
-
+        process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True, bufsize=1)
+    except Exception as e:
+        output_text.insert(tk.END, f"\n[ERROR] Could not start the schedule worker: {str(e)}")
+        return False
+    worker['process'] = process
+    threading.Thread(target=read_worker_events, args=(process,), daemon=True).start()
+    if library_sheet_filepath:
+        send_to_worker({'cmd': 'load_library', 'path': library_sheet_filepath})
+    return True
+
+def stop_worker():
+    process = worker['process']
+    if process is not None and process.poll() is None:
+        process.stdin.close()  # The worker exits when its stdin closes
+
+def send_to_worker(command):
+    process = worker['process']
+    if process is None or process.poll() is not None:
+        return False
+    try:
+        process.stdin.write(json.dumps(command) + "\n")
+        process.stdin.flush()
+        return True
+    except OSError:
+        return False
+
+def read_worker_events(process):
+    """Translates the worker's JSON events into the same queue entries as script jobs."""
+    for line in iter(process.stdout.readline, ''):
+        try:
+            event = json.loads(line)
+        except ValueError:
+            continue
+        if event['event'] == 'output':
+            output_queue.put((event['job_id'], 'stdout', event['data']))
+        elif event['event'] == 'exit':
+            output_queue.put((event['job_id'], 'exit', event['code']))
+        elif event['event'] == 'status':
+            output_queue.put((event['job_id'], 'status', event))
+        elif event['event'] in ('library', 'ready'):
+            output_queue.put((None, event['event'], event))
+    output_queue.put((None, 'worker_exit', process))
+
+def read_stream(job_id, stream, stream_name):
+    """Reads a job's stdout or stderr line by line and queues each line for the GUI."""
+    for line in iter(stream.readline, ''):
+        output_queue.put((job_id, stream_name, line))
+    stream.close()
+
+def wait_for_job(job_id, process, reader_threads):
+    """Waits for a job's output to be fully read and then queues its exit status."""
+    for reader in reader_threads:
+        reader.join()
+    output_queue.put((job_id, 'exit', process.wait()))
+
+def add_job(label, process, worker_process=None):
+    """Adds a row with its own cancel button to the running jobs list and returns the job ID."""
+    global job_counter
+    job_counter += 1
+    job_id = job_counter
+
+    job_row = tk.Frame(jobs_frame)
+    job_row.pack(fill=tk.X)
+    tk.Label(job_row, text=label).pack(side=tk.LEFT)
+    tk.Button(job_row, text="Cancel", command=lambda: cancel_job(job_id)).pack(side=tk.RIGHT)
+
+    active_jobs[job_id] = {'label': label, 'process': process, 'worker': worker_process, 'row': job_row, 'stderr': [], 'cancelled': False}
+    return job_id
+
+def start_worker_job(label, channel_name, input_date_str, library_sheet_filepath):
+    """Runs a channel in the warm worker, restarting the worker first if it has exited."""
+    if worker['process'] is None or worker['process'].poll() is not None:
+        if not start_worker():
+            return
+    job_id = add_job(label, None, worker['process'])
+    sent = send_to_worker({
+        'cmd': 'run',
+        'job_id': job_id,
+        'channel': channel_name,
+        'date': input_date_str,
+        'library_path': library_sheet_filepath,
+        'output_dir': downloads_folder
+    })
+    if not sent:
+        output_queue.put((job_id, 'stderr', "The schedule worker is not running.\n"))
+        output_queue.put((job_id, 'exit', 1))
+
+def start_job(label, command):
+    """Starts a channel script without blocking the GUI and adds it to the running jobs list."""
+    try:
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, bufsize=1)
     except Exception as e:
         output_text.insert(tk.END, f"\n[ERROR] {str(e)}")
         output_text.see(tk.END)  # Auto-scroll to the bottom
+        return
 
-# Function to run the selected script with the input date and library sheet
-def run_script_with_sheet(script_name, input_date_str, library_sheet_filepath):
-    try:
-        #python_executable = "/Users/aarongarner/Desktop/OTT-SCHEDULE-CREATOR/ott_sched_env/bin/python3"  # For Linux/macOS
-        python_executable = sys.executable
-        command = [python_executable, os.path.join(os.path.dirname(__file__), script_name), input_date_str, library_sheet_filepath]
-        result = subprocess.run(command, capture_output=True, text=True)
-        
-        output_text.insert(tk.END, result.stdout)  # Insert new output
-        output_text.see(tk.END)  # Auto-scroll to the bottom
+    job_id = add_job(label, process)
+
+    reader_threads = [
+        threading.Thread(target=read_stream, args=(job_id, process.stdout, 'stdout'), daemon=True),
+        threading.Thread(target=read_stream, args=(job_id, process.stderr, 'stderr'), daemon=True)
+    ]
+    for reader in reader_threads:
+        reader.start()
+    threading.Thread(target=wait_for_job, args=(job_id, process, reader_threads), daemon=True).start()
 
-        if result.stderr and 'UserWarning' not in result.stderr:
-            output_text.insert(tk.END, "\n[ERROR] " + result.stderr)
+def cancel_job(job_id):
+    job = active_jobs.get(job_id)
+    if job is None or job['cancelled']:
+        return
+    if job['process'] is None:
+        # Worker jobs stop streaming output and skip writing their sheet
+        job['cancelled'] = True
+        send_to_worker({'cmd': 'cancel', 'job_id': job_id})
+    elif job['process'].poll() is None:
+        job['cancelled'] = True
+        job['process'].terminate()
+
+def poll_output():
+    """Moves queued job output into the Text widget; runs on the Tk main thread."""
+    while True:
+        try:
+            job_id, stream_name, data = output_queue.get_nowait()
+        except queue.Empty:
+            break
+        if job_id is None:
+            handle_worker_event(stream_name, data)
+            continue
+        job = active_jobs.get(job_id)
+        if job is None:
+            continue
+        # Tag lines with the channel when several jobs are writing at once
+        prefix = f"[{job['label']}] " if len(active_jobs) > 1 else ""
+
+        if stream_name == 'stdout':
+            if job['cancelled']:
+                continue
+            output_text.insert(tk.END, prefix + data)
+            output_text.see(tk.END)  # Auto-scroll to the bottom
+        elif stream_name == 'stderr':
+            job['stderr'].append(data)
+        elif stream_name == 'status':
+            update_batch_status(job_id, data['channel'], data['status'], data['elapsed_seconds'])
+        else:
+            if job_id == batch_state['job_id']:
+                finish_batch(job['cancelled'])
+            stderr = ''.join(job['stderr'])
+            if job['cancelled']:
+                output_text.insert(tk.END, f"\n[CANCELLED] {job['label']}\n")
+            elif stderr and 'UserWarning' not in stderr:
+                output_text.insert(tk.END, "\n[ERROR] " + prefix + stderr)
             output_text.see(tk.END)  # Auto-scroll to the bottom
+            job['row'].destroy()
+            del active_jobs[job_id]
 
-    except Exception as e:
-        output_text.insert(tk.END, f"\n[ERROR] {str(e)}")
+    root.after(POLL_INTERVAL_MS, poll_output)
+
+def handle_worker_event(event_name, data):
+    """Reports library loads and fails any jobs that were running in a worker that exited."""
+    if event_name == 'ready':
+        populate_batch_channels(data['channels'])
+        return
+    if event_name == 'library':
+        if data['ok']:
+            output_text.insert(tk.END, f"\nLibrary loaded: {data['rows']} titles indexed in {data['seconds']}s.\n")
+        else:
+            output_text.insert(tk.END, f"\n[ERROR] Could not load the library sheet: {data['message']}\n")
+    elif event_name == 'worker_exit':
+        for job_id, job in list(active_jobs.items()):
+            if job['worker'] is data:
+                if job_id == batch_state['job_id']:
+                    finish_batch(job['cancelled'])  # Its channels will never report back
+                if not job['cancelled']:
+                    output_text.insert(tk.END, f"\n[ERROR] {job['label']}: the schedule worker stopped unexpectedly.\n")
+                job['row'].destroy()
+                del active_jobs[job_id]
+        if worker['process'] is data:
+            worker['process'] = None
+    output_text.see(tk.END)  # Auto-scroll to the bottom
+
+def populate_batch_channels(channel_names):
+    """Adds a checkbox per channel to the batch section the first time the worker is ready."""
+    if batch_channel_vars:
+        return
+    for channel_name in channel_names:
+        var = tk.BooleanVar(value=True)
+        tk.Checkbutton(batch_channels_frame, text=channel_name, variable=var).pack(anchor=tk.W)
+        batch_channel_vars[channel_name] = var
+
+def select_all_batch_channels():
+    for var in batch_channel_vars.values():
+        var.set(True)
+
+def run_batch_channels():
+    """Runs every selected channel in parallel in the worker against the uploaded library."""
+    if not library_sheet_filepath:
+        output_text.insert(tk.END, "\nNo OTTera library sheet selected!\n")
+        output_text.see(tk.END)  # Auto-scroll to the bottom
+        return
+    selected_channels = [name for name, var in batch_channel_vars.items() if var.get()]
+    if not selected_channels:
+        output_text.insert(tk.END, "\nPlease select at least one channel.\n")
         output_text.see(tk.END)  # Auto-scroll to the bottom
+        return
+    if worker['process'] is None or worker['process'].poll() is not None:
+        if not start_worker():
+            return
+
+    input_date_str = cal.get_date()
+    job_id = add_job(f"Batch: {len(selected_channels)} channels ({input_date_str})", None, worker['process'])
+
+    # Reset the status table for this batch
+    batch_table.delete(*batch_table.get_children())
+    batch_state['job_id'] = job_id
+    batch_state['rows'] = {}
+    for channel_name in selected_channels:
+        batch_state['rows'][channel_name] = {'status': 'queued', 'started': time.time(), 'elapsed': None}
+        batch_table.insert('', tk.END, iid=channel_name, values=(channel_name, 'queued', ''))
+
+    sent = send_to_worker({
+        'cmd': 'batch',
+        'job_id': job_id,
+        'channels': selected_channels,
+        'date': input_date_str,
+        'library_path': library_sheet_filepath,
+        'output_dir': downloads_folder
+    })
+    if not sent:
+        output_queue.put((job_id, 'stderr', "The schedule worker is not running.\n"))
+        output_queue.put((job_id, 'exit', 1))
+
+def update_batch_status(job_id, channel_name, status, elapsed_seconds):
+    row = batch_state['rows'].get(channel_name)
+    if job_id != batch_state['job_id'] or row is None:
+        return
+    if status == 'running':
+        row['started'] = time.time()
+    else:
+        row['elapsed'] = elapsed_seconds
+    row['status'] = status
+    elapsed = row['elapsed'] if row['elapsed'] is not None else time.time() - row['started']
+    batch_table.item(channel_name, values=(channel_name, status, f"{elapsed:.1f}s"))
+
+def finish_batch(cancelled):
+    """Marks any channel that never reported back when its batch ends."""
+    for channel_name, row in batch_state['rows'].items():
+        if row['status'] in ('queued', 'running'):
+            row['status'] = 'cancelled' if cancelled else 'failed'
+            row['elapsed'] = time.time() - row['started']
+            batch_table.item(channel_name, values=(channel_name, row['status'], f"{row['elapsed']:.1f}s"))
+    batch_state['job_id'] = None
+
+def refresh_batch_elapsed():
+    """Ticks the elapsed time of channels that are still running."""
+    for channel_name, row in batch_state['rows'].items():
+        if row['status'] == 'running':
+            batch_table.item(channel_name, values=(channel_name, 'running', f"{time.time() - row['started']:.1f}s"))
+    root.after(BATCH_REFRESH_MS, refresh_batch_elapsed)
+
+# Function to run the selected script with the input date
+def run_script(script_name, input_date_str):
+    #python_executable = "/Users/aarongarner/Desktop/OTT-SCHEDULE-CREATOR/ott_sched_env/bin/python3"  # For Linux/macOS
+    python_executable = sys.executable
+    command = [python_executable, '-u', os.path.join(os.path.dirname(__file__), script_name), input_date_str]
+    start_job(script_name, command)
+
+# Function to run the selected script with the input date and library sheet
+def run_script_with_sheet(script_name, input_date_str, library_sheet_filepath):
+    #python_executable = "/Users/aarongarner/Desktop/OTT-SCHEDULE-CREATOR/ott_sched_env/bin/python3"  # For Linux/macOS
+    python_executable = sys.executable
+    command = [python_executable, '-u', os.path.join(os.path.dirname(__file__), script_name), input_date_str, library_sheet_filepath]
+    start_job(script_name, command)
 
 # Function to get the input date from the calendar and run the active house code grabber script
 def get_date_and_run_ahcg(script_name):
@@ -56,7 +335,10 @@ def get_date_and_run_schedule_creator(script_name, library_sheet_filepath):
         output_text.see(tk.END)  # Auto-scroll to the bottom
         return
     input_date_str = cal.get_date()
-    run_script_with_sheet(script_name, input_date_str, library_sheet_filepath)
+    if script_name in WORKER_CHANNELS:
+        start_worker_job(script_name, WORKER_CHANNELS[script_name], input_date_str, library_sheet_filepath)
+    else:
+        run_script_with_sheet(script_name, input_date_str, library_sheet_filepath)
 
 # Function to handle file upload and store the file path
 def upload_file():
@@ -65,6 +347,7 @@ def upload_file():
     if filename:
         library_sheet_filepath = filename  # Store the filepath in the global variable
         file_label.config(text=filename.split('/')[-1])  # Display only the filename
+        send_to_worker({'cmd': 'load_library', 'path': filename})  # Parse and index it ahead of the first run
 
 library_sheet_filepath = ''
 
@@ -146,6 +429,33 @@ pll_int_sched_button.pack(pady=5)
 psw_sched_button = tk.Button(lower_frame, text="PowerSports World", command=lambda: get_date_and_run_schedule_creator('schedule_creator_psw.py', library_sheet_filepath))
 psw_sched_button.pack(pady=5)
 
+# Batch section (Run channels in parallel into one combined sheet)
+batch_frame = tk.LabelFrame(main_frame, text="Run Channels in Batch", padx=10, pady=10)
+batch_frame.grid(row=0, column=3, padx=10, pady=10, sticky="n")
+
+batch_channels_frame = tk.Frame(batch_frame)
+batch_channels_frame.pack(pady=5, fill=tk.X)
+
+batch_select_all_button = tk.Button(batch_frame, text="Select All", command=select_all_batch_channels)
+batch_select_all_button.pack(pady=5)
+
+batch_run_button = tk.Button(batch_frame, text="Run Selected Channels", command=run_batch_channels)
+batch_run_button.pack(pady=5)
+
+# Live per-channel status of the latest batch
+batch_table = ttk.Treeview(batch_frame, columns=('channel', 'status', 'elapsed'), show='headings', height=8)
+batch_table.heading('channel', text="Channel")
+batch_table.heading('status', text="Status")
+batch_table.heading('elapsed', text="Elapsed")
+batch_table.column('channel', width=140)
+batch_table.column('status', width=80)
+batch_table.column('elapsed', width=70)
+batch_table.pack(pady=5)
+
+# Jobs that are still running, each with a cancel button
+jobs_frame = tk.LabelFrame(root, text="Running Jobs", padx=10, pady=5)
+jobs_frame.pack(fill=tk.X, padx=10)
+
 # Create a frame for the output text and scrollbar
 output_frame = tk.Frame(root)
 output_frame.pack(pady=10)
@@ -164,5 +474,18 @@ font = tkFont.Font(family="Helvetica", size=24)  # Change 'size' to your preferr
 # Configure the scrollbar to work with the Text widget
 scrollbar.config(command=output_text.yview)
 
+# Start draining job output into the Text widget
+root.after(POLL_INTERVAL_MS, poll_output)
+root.after(BATCH_REFRESH_MS, refresh_batch_elapsed)
+
+# Warm up the worker while the user picks a date and a library sheet
+start_worker()
+
+def on_close():
+    stop_worker()
+    root.destroy()
+
+root.protocol("WM_DELETE_WINDOW", on_close)
+
 # Run the GUI event loop
 root.mainloop()
\ No newline at end of file
@@ -212,7 +212,7 @@ class ProcessingEngine:
 
     def _download_sheet(self, spreadsheet_id, sheet_name, output_file):
         # schedule for '{sheet_name}'...")
-        url = f"https://docs.google.com/spreadsheets/d/{spreadsheet_id}/gviz/tq?tqx=out:csv&sheet={sheet_name}"
+        url = f"{os.environ.get('GVIZ_BASE_URL', 'https://docs.google.com')}/spreadsheets/d/{spreadsheet_id}/gviz/tq?tqx=out:csv&sheet={sheet_name}"
         try:
             response = requests.get(url, timeout=30)
             if response.status_code == 200:
@@ -0,0 +1,331 @@
+import os
+import sys
+import json
+import time
+import bisect
+import sqlite3
+import argparse
+import threading
+from datetime import datetime, timedelta
+import pandas as pd
+from schedule_limits import start_minutes
+
+# Local archive of every generated schedule, so old weeks can be looked up without the
+# Slack upload or the grid. One SQLite file holds one schedule per (channel, week) - a
+# re-run of the same week replaces it - with its upload rows, and every house code and
+# bumper it aired exploded into an indexed airings table:
+#
+#   python schedule_archive.py last BARK123
+#   python schedule_archive.py count PLL45 --quarter 2026Q1
+#   python schedule_archive.py export BarkTV 2026-03-02 > BarkTV.csv
+#
+# Set SCHEDULE_ARCHIVE="" to stop archiving.
+
+ARCHIVE_PATH = os.environ.get("SCHEDULE_ARCHIVE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "logs", "schedule_archive.sqlite3"))
+SLOT_COLUMNS = ['date', 'linear_channel', 'bumpers_in', 'bumpers_out', 'content', 'randomize_content', 'slot_duration', 'time_slot']
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS schedules (
+    id INTEGER PRIMARY KEY,
+    channel TEXT NOT NULL,
+    linear_channel TEXT,
+    week_start TEXT NOT NULL,
+    archived_at TEXT NOT NULL,
+    run_id TEXT,
+    slot_count INTEGER NOT NULL,
+    UNIQUE (channel, week_start)
+);
+CREATE TABLE IF NOT EXISTS slots (
+    schedule_id INTEGER NOT NULL REFERENCES schedules(id) ON DELETE CASCADE,
+    channel TEXT NOT NULL,
+    air_date TEXT NOT NULL,
+    time_slot TEXT NOT NULL,
+    slot_duration INTEGER,
+    bumpers_in TEXT,
+    bumpers_out TEXT,
+    content TEXT,
+    randomize_content TEXT,
+    linear_channel TEXT
+);
+CREATE TABLE IF NOT EXISTS airings (
+    schedule_id INTEGER NOT NULL REFERENCES schedules(id) ON DELETE CASCADE,
+    channel TEXT NOT NULL,
+    air_date TEXT NOT NULL,
+    time_slot TEXT NOT NULL,
+    role TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    house_code TEXT NOT NULL,
+    node_id TEXT
+);
+CREATE INDEX IF NOT EXISTS slots_by_schedule ON slots (schedule_id);
+CREATE INDEX IF NOT EXISTS slots_by_channel_date ON slots (channel, air_date);
+CREATE INDEX IF NOT EXISTS airings_by_schedule ON airings (schedule_id);
+CREATE INDEX IF NOT EXISTS airings_by_house_code ON airings (house_code, air_date);
+CREATE INDEX IF NOT EXISTS airings_by_node_id ON airings (node_id, air_date);
+CREATE INDEX IF NOT EXISTS airings_by_channel_date ON airings (channel, air_date);
+"""
+
+# Writers in this process take turns; other processes wait on SQLite's own lock.
+_write_lock = threading.Lock()
+_initialized_paths = set()
+
+def connect(path=None):
+    path = path or ARCHIVE_PATH
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    connection = sqlite3.connect(path, timeout=30)
+    connection.execute("PRAGMA foreign_keys = ON")
+    if path not in _initialized_paths:
+        connection.execute("PRAGMA journal_mode = WAL")  # Readers don't block the bot's writes
+        connection.executescript(SCHEMA)
+        _initialized_paths.add(path)
+    return connection
+
+def iso_date(date_str):
+    """Grid dates are MM/DD/YYYY; the archive stores YYYY-MM-DD so ranges sort and compare."""
+    return datetime.strptime(date_str, "%m/%d/%Y").strftime("%Y-%m-%d")
+
+def _airing_rows(programming_df, library_df):
+    """
+    One row per house code and bumper of every block, with the node ID it was mapped to.
+    Blocks without a readable start time aired at no known time and are left out.
+    """
+    node_ids = dict(zip(library_df['legacy_id'], library_df['id'].astype(str)))
+    rows = []
+    for air_date, start_time, house_codes, bumpers_in, bumpers_out in programming_df[['Air Date', 'Start Time', 'House Code', 'Bumper In', 'Bumper Out']].itertuples(index=False):
+        if start_minutes(start_time) is None:
+            continue
+        for role, codes in (('content', house_codes), ('bumper_in', bumpers_in), ('bumper_out', bumpers_out)):
+            for position, code in enumerate(filter(None, str(codes).split('|ad_break|'))):
+                node_id = code.replace('MEDIALIST', '') if code.startswith('MEDIALIST') else node_ids.get(code)
+                rows.append((iso_date(air_date), start_time, role, position, code, node_id))
+    return rows
+
+def archive_schedule(config, programming_df, output_df, library_df, run_id=None, path=None):
+    """
+    Stores one successful run: the upload rows and the exploded airings. Returns the
+    schedule's week start. The week is taken from the air dates, so any input date of
+    the week archives to the same partition and replaces the earlier run.
+    """
+    air_dates = [iso_date(air_date) for air_date in output_df['date']]
+    first_day = datetime.strptime(min(air_dates), "%Y-%m-%d")
+    week_start = (first_day - timedelta(days=first_day.weekday())).strftime("%Y-%m-%d")
+    channel = config['output_prefix']
+    slot_rows = [
+        (channel, air_date, row.time_slot, int(row.slot_duration), row.bumpers_in, row.bumpers_out, row.content, row.randomize_content, str(row.linear_channel))
+        for air_date, row in zip(air_dates, output_df[SLOT_COLUMNS].itertuples(index=False))
+    ]
+    airing_rows = _airing_rows(programming_df, library_df)
+
+    with _write_lock:
+        connection = connect(path)
+        try:
+            with connection:
+                connection.execute("DELETE FROM schedules WHERE channel = ? AND week_start = ?", (channel, week_start))
+                schedule_id = connection.execute(
+                    "INSERT INTO schedules (channel, linear_channel, week_start, archived_at, run_id, slot_count) VALUES (?, ?, ?, ?, ?, ?)",
+                    (channel, str(config['linear_channel_id']), week_start, datetime.now().isoformat(timespec='seconds'), run_id, len(slot_rows))
+                ).lastrowid
+                connection.executemany(
+                    "INSERT INTO slots (schedule_id, channel, air_date, time_slot, slot_duration, bumpers_in, bumpers_out, content, randomize_content, linear_channel) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [(schedule_id, *row) for row in slot_rows]
+                )
+                connection.executemany(
+                    "INSERT INTO airings (schedule_id, channel, air_date, time_slot, role, position, house_code, node_id) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    [(schedule_id, channel, *row) for row in airing_rows]
+                )
+        finally:
+            connection.close()
+    return week_start
+
+class AirtimeIndex:
+    """
+    Sorted airtimes per house code. Airings are appended and each code's list is sorted
+    once on first read, so counts in a window and gaps between airings are bisects and
+    neighbour comparisons instead of scans of every week.
+    """
+    def __init__(self):
+        self._airtimes = {}
+        self._unsorted = set()
+
+    def add(self, code, airtime):
+        self._airtimes.setdefault(code, []).append(airtime)
+        self._unsorted.add(code)
+
+    def airings(self, code, since=None, until=None):
+        """Airtimes of the code in [since, until), oldest first."""
+        airtimes = self._airtimes.get(code, [])
+        if code in self._unsorted:
+            airtimes.sort()
+            self._unsorted.discard(code)
+        start = bisect.bisect_left(airtimes, since) if since else 0
+        end = bisect.bisect_left(airtimes, until) if until else len(airtimes)
+        return airtimes[start:end]
+
+    def close_repeats(self, code, min_gap, since=None):
+        """(previous, airtime) pairs less than min_gap apart, for airtimes from since on."""
+        airtimes = self.airings(code)
+        start = max(1, bisect.bisect_left(airtimes, since)) if since else 1
+        return [(airtimes[i - 1], airtimes[i]) for i in range(start, len(airtimes)) if airtimes[i] - airtimes[i - 1] < min_gap]
+
+def load_airtime_index(channel, since, until, roles=('content',), path=None):
+    """Builds an AirtimeIndex of the channel's archived airings with air dates in [since, until)."""
+    connection = connect(path)
+    try:
+        rows = connection.execute(
+            f"SELECT house_code, air_date, time_slot FROM airings WHERE channel = ? AND air_date >= ? AND air_date < ? AND role IN ({', '.join('?' for _ in roles)})",
+            (channel, since, until, *roles)
+        ).fetchall()
+    finally:
+        connection.close()
+    index = AirtimeIndex()
+    for code, air_date, time_slot in rows:
+        try:
+            index.add(code, datetime.strptime(f"{air_date} {time_slot}", "%Y-%m-%d %H:%M"))
+        except ValueError:
+            continue  # Archived before blank-time blocks were left out of the airings
+    return index
+
+# --- Queries; a code made only of digits is looked up as a node ID, anything else as a house code ---
+
+def _code_filter(code, channel=None, since=None, until=None, roles=('content',)):
+    column = 'node_id' if code.isdigit() else 'house_code'
+    clauses, params = [f"{column} = ?"], [code.upper() if column == 'house_code' else code]
+    if roles:
+        clauses.append(f"role IN ({', '.join('?' for _ in roles)})")
+        params.extend(roles)
+    if channel:
+        clauses.append("channel = ?")
+        params.append(channel)
+    if since:
+        clauses.append("air_date >= ?")
+        params.append(since)
+    if until:
+        clauses.append("air_date <= ?")
+        params.append(until)
+    return " AND ".join(clauses), params
+
+def last_aired(code, channel=None, roles=('content',), path=None):
+    """The most recent airing of a house code or node ID, or None."""
+    where, params = _code_filter(code, channel, roles=roles)
+    connection = connect(path)
+    try:
+        row = connection.execute(
+            f"SELECT channel, air_date, time_slot, role, house_code, node_id FROM airings WHERE {where} ORDER BY air_date DESC, time_slot DESC LIMIT 1", params
+        ).fetchone()
+    finally:
+        connection.close()
+    return dict(zip(('channel', 'air_date', 'time_slot', 'role', 'house_code', 'node_id'), row)) if row else None
+
+def airing_counts(code, since=None, until=None, channel=None, roles=('content',), path=None):
+    """How often a house code or node ID aired in the date range, per channel."""
+    where, params = _code_filter(code, channel, since, until, roles)
+    connection = connect(path)
+    try:
+        rows = connection.execute(
+            f"SELECT channel, COUNT(*), MIN(air_date), MAX(air_date) FROM airings WHERE {where} GROUP BY channel ORDER BY channel", params
+        ).fetchall()
+    finally:
+        connection.close()
+    return {
+        'total': sum(row[1] for row in rows),
+        'by_channel': {channel_name: {'airings': count, 'first': first, 'last': last} for channel_name, count, first, last in rows}
+    }
+
+def airing_history(code, limit=50, channel=None, roles=('content',), path=None):
+    where, params = _code_filter(code, channel, roles=roles)
+    connection = connect(path)
+    try:
+        rows = connection.execute(
+            f"SELECT channel, air_date, time_slot, role, house_code, node_id FROM airings WHERE {where} ORDER BY air_date DESC, time_slot DESC LIMIT ?", params + [limit]
+        ).fetchall()
+    finally:
+        connection.close()
+    return [dict(zip(('channel', 'air_date', 'time_slot', 'role', 'house_code', 'node_id'), row)) for row in rows]
+
+def load_schedule(channel, week_start, path=None):
+    """Rebuilds the upload sheet of an archived week, or returns None."""
+    connection = connect(path)
+    try:
+        schedule_df = pd.read_sql_query(
+            "SELECT slots.air_date, slots.linear_channel, slots.bumpers_in, slots.bumpers_out, slots.content, slots.randomize_content, slots.slot_duration, slots.time_slot "
+            "FROM slots JOIN schedules ON schedules.id = slots.schedule_id WHERE schedules.channel = ? AND schedules.week_start = ? ORDER BY slots.rowid",
+            connection, params=(channel, week_start)
+        )
+    finally:
+        connection.close()
+    if schedule_df.empty:
+        return None
+    schedule_df['air_date'] = pd.to_datetime(schedule_df['air_date']).dt.strftime("%m/%d/%Y")
+    return schedule_df.rename(columns={'air_date': 'date'})[SLOT_COLUMNS]
+
+def list_schedules(channel=None, path=None):
+    connection = connect(path)
+    try:
+        rows = connection.execute(
+            "SELECT channel, week_start, slot_count, archived_at, run_id FROM schedules" + (" WHERE channel = ?" if channel else "") + " ORDER BY week_start, channel",
+            (channel,) if channel else ()
+        ).fetchall()
+    finally:
+        connection.close()
+    return [dict(zip(('channel', 'week_start', 'slot_count', 'archived_at', 'run_id'), row)) for row in rows]
+
+def quarter_range(quarter):
+    """'2026Q1' -> ('2026-01-01', '2026-03-31')."""
+    year, number = int(quarter[:4]), int(quarter[-1])
+    start = datetime(year, 3 * number - 2, 1)
+    end = datetime(year + (number == 4), (3 * number) % 12 + 1, 1) - timedelta(days=1)
+    return start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d")
+
+def main():
+    parser = argparse.ArgumentParser(description="Query the archive of generated schedules.")
+    parser.add_argument("--archive", default=ARCHIVE_PATH, help="Archive file (default: SCHEDULE_ARCHIVE).")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    def add_code_options(subparser):
+        subparser.add_argument("code", help="House code, or a node ID (digits only).")
+        subparser.add_argument("--channel", help="Only this channel (output prefix, e.g. BarkTV).")
+        subparser.add_argument("--bumpers", action="store_true", help="Count bumper airings as well as content.")
+
+    add_code_options(subparsers.add_parser("last", help="When a code last aired."))
+    count_parser = subparsers.add_parser("count", help="How often a code aired in a date range.")
+    add_code_options(count_parser)
+    count_parser.add_argument("--since", help="YYYY-MM-DD")
+    count_parser.add_argument("--until", help="YYYY-MM-DD")
+    count_parser.add_argument("--quarter", help="e.g. 2026Q1; overrides --since/--until.")
+    history_parser = subparsers.add_parser("history", help="The latest airings of a code.")
+    add_code_options(history_parser)
+    history_parser.add_argument("--limit", type=int, default=50)
+    list_parser = subparsers.add_parser("list", help="Archived channel weeks.")
+    list_parser.add_argument("--channel")
+    export_parser = subparsers.add_parser("export", help="Print an archived week's upload sheet as CSV.")
+    export_parser.add_argument("channel")
+    export_parser.add_argument("week_start", help="Monday of the week, YYYY-MM-DD.")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.archive):
+        print(f"Error: No archive at {args.archive}.", file=sys.stderr)
+        sys.exit(1)
+    roles = ('content', 'bumper_in', 'bumper_out') if getattr(args, 'bumpers', False) else ('content',)
+    started = time.perf_counter()
+    if args.command == "last":
+        result = last_aired(args.code, args.channel, roles, path=args.archive)
+    elif args.command == "count":
+        since, until = quarter_range(args.quarter) if args.quarter else (args.since, args.until)
+        result = {'since': since, 'until': until, **airing_counts(args.code, since, until, args.channel, roles, path=args.archive)}
+    elif args.command == "history":
+        result = airing_history(args.code, args.limit, args.channel, roles, path=args.archive)
+    elif args.command == "list":
+        result = list_schedules(args.channel, path=args.archive)
+    else:
+        schedule_df = load_schedule(args.channel, args.week_start, path=args.archive)
+        if schedule_df is None:
+            print(f"Error: No archived schedule for {args.channel} in the week of {args.week_start}.", file=sys.stderr)
+            sys.exit(1)
+        sys.stdout.write(schedule_df.to_csv(index=False))
+        return
+    print(json.dumps(result, indent=2))
+    print(f"({(time.perf_counter() - started) * 1000:.1f} ms)", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
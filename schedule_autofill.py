@@ -0,0 +1,156 @@
+import re
+import sys
+import json
+import time
+import bisect
+import argparse
+import warnings
+from datetime import datetime, timedelta
+from schedule_limits import REPEAT_MAX_AIRINGS, REPEAT_MIN_GAP_HOURS, VALID_DURATIONS, start_minutes
+
+# Auto-fill: proposes *FILL content for slots whose fill doesn't fit the slot length and for
+# empty time at the start of a day. The library's fill codes are indexed by duration once,
+# so each slot's candidates are a bisect into the range VALID_DURATIONS allows for it; among
+# them the solver prefers the code aired least, then longest ago, without breaking the
+# channel's repeat limits. Proposals are suggestions in the log; the sheet is never changed.
+#
+#   python schedule_autofill.py Bark 2026-03-02 --library library.csv
+
+FILL_SLOT_MINUTES = 60  # Empty time is proposed as slots of this length, plus a 30-minute remainder
+
+def fill_pattern(config):
+    """The channel's fill codes: config['fill_pattern'], or the *FILL alternatives of its house code pattern."""
+    if config.get('fill_pattern'):
+        return config['fill_pattern']
+    alternatives = [part for part in config['house_code_pattern'].strip('()').split('|') if 'FILL' in part]
+    return f"({'|'.join(alternatives)})" if alternatives else None
+
+def valid_seconds(slot_minutes):
+    """[low, high) content seconds that fit the slot; the table compares whole HH:MM minutes."""
+    start, end = VALID_DURATIONS[slot_minutes]
+    to_minutes = lambda hhmm: int(hhmm[:2]) * 60 + int(hhmm[3:])
+    return to_minutes(start) * 60, (to_minutes(end) + 1) * 60
+
+class DurationIndex:
+    """A channel's fill codes sorted by duration in seconds."""
+    def __init__(self, library_df, pattern):
+        fills = library_df[library_df['legacy_id'].astype(str).str.fullmatch(pattern) & (library_df['duration'] > 0)]
+        fills = fills.sort_values(['duration', 'legacy_id'])
+        self.durations = fills['duration'].astype(int).tolist()
+        self.codes = fills['legacy_id'].astype(str).tolist()
+
+    def __len__(self):
+        return len(self.codes)
+
+    def candidates(self, slot_minutes):
+        """(code, seconds) of every fill that fits the slot."""
+        if slot_minutes not in VALID_DURATIONS:
+            return []
+        low, high = valid_seconds(slot_minutes)
+        start, end = bisect.bisect_left(self.durations, low), bisect.bisect_left(self.durations, high)
+        return list(zip(self.codes[start:end], self.durations[start:end]))
+
+def split_minutes(minutes):
+    """Splits empty time into FILL_SLOT_MINUTES slots and a 30-minute remainder."""
+    slots = [FILL_SLOT_MINUTES] * (minutes // FILL_SLOT_MINUTES)
+    if minutes % FILL_SLOT_MINUTES:
+        slots.append(minutes % FILL_SLOT_MINUTES)
+    return slots
+
+def slots_to_fill(programming_df, unfit_durations, pattern):
+    """
+    The slots to solve, in air order: fill codes flagged with a duration mismatch, and
+    the empty time before each day's first block. Blocks without a readable start time
+    are left out.
+    """
+    slots = []
+    fill_regex = re.compile(pattern)
+    for unfit in unfit_durations:
+        if fill_regex.fullmatch(str(unfit['House Code'])) and start_minutes(unfit['Start Time']) is not None:
+            slots.append({'Air Date': unfit['Air Date'], 'Start Time': unfit['Start Time'], 'Slot Duration (minutes)': unfit['Slot Duration (minutes)'],
+                          'Reason': 'duration_mismatch', 'Current Code': unfit['House Code']})
+    for air_date, start_times in programming_df.groupby('Air Date', sort=False)['Start Time']:
+        # Blocks under a blank or unreadable time label have no place in the day
+        starts = [minutes for minutes in map(start_minutes, start_times) if minutes is not None]
+        if not starts:
+            continue
+        empty_minutes = min(starts)
+        slot_start = datetime.strptime(air_date, "%m/%d/%Y")
+        for minutes in split_minutes(empty_minutes):
+            slots.append({'Air Date': air_date, 'Start Time': slot_start.strftime("%H:%M"), 'Slot Duration (minutes)': minutes,
+                          'Reason': 'empty', 'Current Code': None})
+            slot_start += timedelta(minutes=minutes)
+    return sorted(slots, key=lambda slot: (datetime.strptime(slot['Air Date'], "%m/%d/%Y"), slot['Start Time']))
+
+def propose_fills(config, slots, duration_index, airtime_index, max_airings=None, min_gap_hours=None):
+    """
+    Picks a fill for each slot greedily in air order. A code is skipped if it would go
+    over max_airings or air within min_gap_hours of another airing; the rest are ranked by
+    airings so far, then the longest since the last airing, then the longest runtime.
+    Chosen fills are added to airtime_index so later slots see them.
+    """
+    max_airings = config.get('repeat_max_airings', REPEAT_MAX_AIRINGS) if max_airings is None else max_airings
+    min_gap_hours = config.get('repeat_min_gap_hours', REPEAT_MIN_GAP_HOURS) if min_gap_hours is None else min_gap_hours
+    min_gap = timedelta(hours=min_gap_hours)
+    proposals = []
+    for slot in slots:
+        airtime = datetime.strptime(f"{slot['Air Date']} {slot['Start Time']}", "%m/%d/%Y %H:%M")
+        best, best_rank = None, None
+        for code, seconds in duration_index.candidates(slot['Slot Duration (minutes)']):
+            if code == slot['Current Code']:
+                continue
+            airings = airtime_index.airings(code)
+            if max_airings and len(airings) >= max_airings:
+                continue
+            if min_gap_hours and airtime_index.airings(code, airtime - min_gap + timedelta(seconds=1), airtime + min_gap):
+                continue
+            previous = airings[bisect.bisect_left(airings, airtime) - 1] if airings and airings[0] < airtime else datetime.min
+            rank = (len(airings), previous, -seconds)
+            if best_rank is None or rank < best_rank:
+                best, best_rank = (code, seconds), rank
+        proposal = {**slot, 'Proposed Code': None, 'Content Duration (seconds)': None}
+        if best:
+            airtime_index.add(best[0], airtime)
+            proposal.update({'Proposed Code': best[0], 'Content Duration (seconds)': best[1]})
+        proposals.append(proposal)
+    return proposals
+
+def solve_week(config, programming_df, library_df, unfit_durations, airtime_index):
+    """Proposals for the week's flagged fills and empty time; [] when the channel has no fill codes."""
+    pattern = fill_pattern(config)
+    if not pattern or programming_df.empty:
+        return []
+    slots = slots_to_fill(programming_df, unfit_durations, pattern)
+    if not slots:
+        return []
+    return propose_fills(config, slots, DurationIndex(library_df, pattern), airtime_index)
+
+def main():
+    from schedule_engine import CHANNEL_CONFIG, ProcessingEngine
+    parser = argparse.ArgumentParser(description="Propose fill content for a channel's week without generating the sheet.")
+    parser.add_argument("channel", choices=list(CHANNEL_CONFIG))
+    parser.add_argument("date", help="Any date in the week.")
+    parser.add_argument("--library", required=True, help="Library CSV export.")
+    args = parser.parse_args()
+    warnings.simplefilter('ignore', UserWarning)  # Date parsing warnings from the grid prep
+
+    with open(args.library, encoding='utf-8') as f:
+        library_content = f.read()
+    engine = ProcessingEngine(CHANNEL_CONFIG[args.channel], args.date, library_content, incremental=False)
+    week_name, input_date = engine._get_week_name_of_input_date(args.date)
+    grid_content = engine._fetch_grid(engine.config['spreadsheet_id'], week_name.upper()) if week_name else None
+    if grid_content is None:
+        print("\n".join(engine.logs), file=sys.stderr)
+        sys.exit(1)
+    programming_df = engine._parse_programming(engine._prepare_grid_data(grid_content, input_date), week_name)
+    library_df = engine._filter_unique_rows_by_latest_date(library_content)
+
+    started = time.perf_counter()
+    airtime_index, _, _ = engine._build_airtime_index(programming_df)
+    proposals = solve_week(engine.config, programming_df, library_df, engine._validate_slot_durations(programming_df, library_df), airtime_index)
+    print(json.dumps(proposals, indent=2))
+    print(f"{sum(1 for proposal in proposals if proposal['Proposed Code'])} of {len(proposals)} slots filled "
+          f"in {time.perf_counter() - started:.3f}s", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+import os
+import io
+import ast
+import sys
+import json
+import time
+import platform
+import argparse
+import warnings
+import importlib
+import statistics
+import subprocess
+import contextlib
+from datetime import datetime
+import pandas as pd
+import schedule_engine
+import schedule_events
+import schedule_archive
+from schedule_engine import CHANNEL_CONFIG
+from schedule_fixtures import make_grid, make_library
+
+# Benchmarks the schedule pipeline on synthetic inputs, so runs are repeatable and need
+# no network. Each ProcessingEngine stage is timed separately for every library size,
+# next to the parsers of the standalone per-channel scripts. Progress goes to stderr and
+# the JSON report to stdout (or --output), ready to be passed back in with --compare.
+
+BENCH_WEEK = "2026-03-02"
+DEFAULT_CHANNELS = ["Bark", "PLL Domestic", "SLVR", "SLVR SoCal"]  # One per processing_logic
+DEFAULT_LIBRARY_ROWS = [1000, 10000, 100000]  # Pass --library-rows 1000000 for the full-size export
+ENGINE_STAGES = ["date", "download", "prepare", "parse", "library", "validate", "assemble"]
+
+# Parser entry point of each standalone script, and how to call it on a prepared grid
+STANDALONE_PARSERS = {
+    "ACL": ("schedule_creator_acl", "process_show_programming", lambda parse, grid_data, input_date: parse(grid_data)),
+    "Bark": ("schedule_creator_bark", "process_show_programming", lambda parse, grid_data, input_date: parse(grid_data)),
+    "Billiard": ("schedule_creator_billiard", "process_show_programming", lambda parse, grid_data, input_date: parse(grid_data)),
+    "PLL Domestic": ("schedule_creator_pll_dom", "parse_programming_grid", lambda parse, grid_data, input_date: parse(grid_data)),
+    "PLL International": ("schedule_creator_pll_int", "process_programming_grid", lambda parse, grid_data, input_date: parse(grid_data, input_date)),
+    "PowerSports World": ("schedule_creator_psw", "process_show_programming", lambda parse, grid_data, input_date: parse(grid_data))
+}
+
+def log(message):
+    print(message, file=sys.stderr, flush=True)
+
+def load_standalone_function(module_name, function_name, script_globals=None):
+    """
+    Loads one function from a standalone script without running the script. Most of them
+    do their work at module level, so only the imports and function definitions are kept;
+    script_globals stands in for the module-level values the functions still read.
+    """
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), f"{module_name}.py")
+    with open(path, encoding='utf-8') as f:
+        tree = ast.parse(f.read(), path)
+    tree.body = [node for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom, ast.FunctionDef))]
+    namespace = {'__name__': module_name, **(script_globals or {})}
+    exec(compile(tree, path, 'exec'), namespace)
+    return namespace[function_name]
+
+def load_engine_class(spec):
+    """Resolves 'module:ClassName' so other engine implementations can be benchmarked."""
+    module_name, _, class_name = spec.partition(':')
+    return getattr(importlib.import_module(module_name), class_name or 'ProcessingEngine')
+
+def make_fixture_engine(engine_class):
+    class FixtureEngine(engine_class):
+        """Serves the week tab from the synthetic grid instead of Google Sheets."""
+        def _download_sheet(self, spreadsheet_id, sheet_name):
+            return make_grid(self.config, BENCH_WEEK)
+    return FixtureEngine
+
+def clear_library_cache():
+    with schedule_engine._library_cache_lock:
+        schedule_engine._library_cache.clear()
+
+def summarize(samples):
+    return {
+        'min': round(min(samples), 6),
+        'median': round(statistics.median(samples), 6),
+        'mean': round(statistics.mean(samples), 6),
+        'max': round(max(samples), 6)
+    }
+
+def time_engine_stages(engine_class, channel_name, library_content):
+    """Runs the engine pipeline once, stage by stage, and returns the seconds spent in each."""
+    config = CHANNEL_CONFIG[channel_name]
+    engine = engine_class(config, BENCH_WEEK, library_content, incremental=False)
+    timings = {}
+    results = {}
+
+    def stage(name, function):
+        started = time.perf_counter()
+        results[name] = function()
+        timings[name] = time.perf_counter() - started
+        return results[name]
+
+    week_name, input_date = stage('date', lambda: engine._get_week_name_of_input_date(BENCH_WEEK))
+    grid_content = stage('download', lambda: engine._fetch_grid(config['spreadsheet_id'], week_name.upper()))
+    with contextlib.redirect_stderr(io.StringIO()):  # The 9th-column truncation warning
+        grid_data = stage('prepare', lambda: engine._prepare_grid_data(grid_content, input_date))
+    programming_df = stage('parse', lambda: engine._parse_programming(grid_data, week_name))
+    clear_library_cache()
+    library_df = stage('library', lambda: engine._filter_unique_rows_by_latest_date(library_content))
+    def validate():
+        findings = engine._collect_validation_findings(programming_df, library_df)
+        return engine._run_validations(programming_df, library_df, findings)  # With the repeat check and auto-fill
+    halted = stage('validate', validate)
+    final_df = stage('assemble', lambda: None if halted else engine._assemble_output(programming_df, library_df))
+    return timings, {'blocks': len(programming_df), 'unique_legacy_ids': len(library_df), 'output_rows': 0 if final_df is None else len(final_df)}
+
+def bench_engine(engine_class, channel_names, library_sizes, repeats):
+    records = []
+    fixture_engine = make_fixture_engine(engine_class)
+    for library_rows in library_sizes:
+        started = time.perf_counter()
+        library_content = make_library(library_rows)  # Same content for a size whichever channels run
+        log(f"Generated a {library_rows:,} row library in {time.perf_counter() - started:.2f}s")
+        for channel_name in channel_names:
+            samples = {stage: [] for stage in ENGINE_STAGES}
+            for _ in range(repeats):
+                timings, counts = time_engine_stages(fixture_engine, channel_name, library_content)
+                for stage, seconds in timings.items():
+                    samples[stage].append(seconds)
+            totals = [sum(samples[stage][i] for stage in ENGINE_STAGES) for i in range(repeats)]
+            for stage in ENGINE_STAGES + ['total']:
+                records.append({
+                    'benchmark': f"engine.{stage}",
+                    'channel': channel_name,
+                    'processing_logic': CHANNEL_CONFIG[channel_name]['processing_logic'],
+                    'library_rows': library_rows,
+                    'repeats': repeats,
+                    'seconds': summarize(totals if stage == 'total' else samples[stage]),
+                    **counts
+                })
+            log(f"  {channel_name:<18} {library_rows:>9,} rows  total {statistics.median(totals):.3f}s  "
+                + "  ".join(f"{stage} {statistics.median(samples[stage]):.3f}" for stage in ENGINE_STAGES))
+    return records
+
+def bench_standalone(channel_names, repeats):
+    records = []
+    for channel_name in channel_names:
+        if channel_name not in STANDALONE_PARSERS:
+            continue
+        module_name, function_name, call = STANDALONE_PARSERS[channel_name]
+        engine = schedule_engine.ProcessingEngine(CHANNEL_CONFIG[channel_name], BENCH_WEEK, '', incremental=False)
+        week_name, input_date = engine._get_week_name_of_input_date(BENCH_WEEK)
+        # The GUI scripts read the date from sys.argv into input_date_str at module level
+        parse = load_standalone_function(module_name, function_name, {'input_date_str': input_date.strftime("%m/%d/%Y")})
+        with contextlib.redirect_stderr(io.StringIO()):
+            grid_data = engine._prepare_grid_data(make_grid(CHANNEL_CONFIG[channel_name], BENCH_WEEK), input_date)
+        samples = []
+        for _ in range(repeats):
+            started = time.perf_counter()
+            blocks = call(parse, grid_data.copy(), input_date)
+            samples.append(time.perf_counter() - started)
+        records.append({
+            'benchmark': f"standalone.{function_name}",
+            'channel': channel_name,
+            'module': module_name,
+            'library_rows': None,
+            'repeats': repeats,
+            'seconds': summarize(samples),
+            'blocks': len(blocks)
+        })
+        log(f"  {module_name}.{function_name:<26} {statistics.median(samples):.3f}s")
+    return records
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def record_key(record):
+    return (record['benchmark'], record['channel'], record['library_rows'])
+
+def compare_reports(baseline, current, threshold):
+    """Logs the median of every benchmark against the baseline and returns the regressions."""
+    baseline_records = {record_key(record): record for record in baseline['results']}
+    regressions = []
+    log(f"\nCompared with {baseline.get('label') or baseline.get('revision')} (regression threshold {threshold:.0%}):")
+    for record in current['results']:
+        previous = baseline_records.get(record_key(record))
+        if not previous:
+            continue
+        ratio = record['seconds']['median'] / previous['seconds']['median'] if previous['seconds']['median'] else 1.0
+        flag = "  REGRESSION" if ratio > 1 + threshold else ""
+        log(f"  {record['benchmark']:<42} {record['channel']:<18} {record['library_rows'] or '':>9}  "
+            f"{previous['seconds']['median']:.4f}s -> {record['seconds']['median']:.4f}s  x{ratio:.2f}{flag}")
+        if flag:
+            regressions.append({**record, 'baseline_median': previous['seconds']['median'], 'ratio': round(ratio, 3)})
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the schedule pipeline on synthetic grids and libraries.")
+    parser.add_argument("channels", nargs="*", default=DEFAULT_CHANNELS, metavar="CHANNEL",
+                        help=f"Channels to benchmark (default: {', '.join(DEFAULT_CHANNELS)}).")
+    parser.add_argument("--library-rows", type=int, nargs="+", default=DEFAULT_LIBRARY_ROWS)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--engine", default="schedule_engine:ProcessingEngine", help="Engine class to benchmark, as module:ClassName.")
+    parser.add_argument("--skip-standalone", action="store_true", help="Only benchmark the engine.")
+    parser.add_argument("--label", help="Name for this run in the report, e.g. a version or branch.")
+    parser.add_argument("--output", help="Write the JSON report to this file instead of stdout.")
+    parser.add_argument("--compare", help="A previous JSON report to compare medians against.")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Slowdown ratio above which --compare fails (default 0.10).")
+    args = parser.parse_args()
+
+    unknown = [name for name in args.channels if name not in CHANNEL_CONFIG]
+    if unknown:
+        log(f"Error: Unknown channel(s): {', '.join(unknown)}. Choose from: {', '.join(CHANNEL_CONFIG.keys())}.")
+        sys.exit(2)
+    warnings.simplefilter('ignore', UserWarning)  # Date parsing warnings from the grid prep
+    schedule_events.EVENT_LOG = ""  # Keep benchmark runs out of the event log and the archive
+    schedule_archive.ARCHIVE_PATH = ""
+
+    engine_class = load_engine_class(args.engine)
+    log(f"{datetime.now().strftime('%Y-%m-%d %H:%M:%S')} | Benchmarking {args.engine} on {', '.join(args.channels)}...")
+    results = bench_engine(engine_class, args.channels, args.library_rows, args.repeats)
+    if not args.skip_standalone:
+        log("Standalone script parsers:")
+        results += bench_standalone(args.channels, args.repeats)
+
+    report = {
+        'label': args.label,
+        'revision': git_revision(),
+        'engine': args.engine,
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'platform': platform.platform(),
+        'results': results
+    }
+    regressions = []
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            regressions = compare_reports(json.load(f), report, args.threshold)
+        report['regressions'] = regressions
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        log(f"\nReport saved to {args.output}!")
+    else:
+        print(json.dumps(report, indent=2))
+    sys.exit(1 if regressions else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+import os
+import re
+import threading
+from array import array
+from collections import OrderedDict
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+from schedule_metrics import CACHE_REQUESTS
+
+# Cell parsing driven by declared rules. A channel's 'parse_rules' is an ordered list of
+# rule names (RULES); the first rule that fires on a cell decides the block it starts.
+# Channels without the key use the preset of their processing_logic.
+#
+# Rules read a cell's state, which computes each match type (MATCHERS) the first time a
+# rule asks for it, so a cell is only searched for what its rules get to. Channels that
+# read the same spreadsheet with the same code patterns (SLVR/SLVR SoCal, PLL
+# Domestic/International) share one cell-state table per week, and a match type one of
+# them computed is already there for the others.
+#
+# The block a cell starts depends only on its text and the channel's rules and patterns,
+# and grids repeat the same cells week after week, so parsed cells go through a bounded
+# LRU cache shared by every channel and week in the process.
+
+MEDIA_LIST_PATTERN = re.compile(r'^MEDIA\s?LIST[:\s]*?(\d+)|[^\w\s][\s]*MEDIA\s?LIST[:\s]*?(\d+)|^ML[:\s]*?(\d+)|[^\w\s][\s]*ML[:\s]*?(\d+)')
+QT_MEDIA_LIST_PATTERN = re.compile(r'QT\s+MEDIA\s?LIST[:\s]*?(\d+)')
+SOCAL_MEDIA_LIST_PATTERN = re.compile(r'SOCAL\s+MEDIA\s?LIST[:\s]*?(\d+)|SOCAL\s+ML[:\s]*?(\d+)')
+SOCAL_MENTION_PATTERN = re.compile(r'SOCAL\s+(MEDIA\s?LIST|ML)')
+
+CELL_CACHE_MAX_ENTRIES = int(os.environ.get("CELL_CACHE_MAX_ENTRIES", "50000"))
+_cell_cache = OrderedDict()
+_cell_cache_lock = threading.Lock()
+_NOT_CACHED = object()
+
+@lru_cache(maxsize=None)
+def compile_patterns(house_code_pattern, bumper_pattern):
+    """The channel's code patterns, compiled once per process."""
+    return {
+        'house_code': re.compile(house_code_pattern),
+        'bumper': re.compile(bumper_pattern) if bumper_pattern else None,
+        'broken_glass': re.compile(r'BROKEN\s?GLASS:?\s*(' + house_code_pattern + r')'),
+        'part_broken_glass': re.compile(r'(?:BROKEN\s?GLASS|B\s?G):?\s*(' + house_code_pattern + r')')
+    }
+
+def _list_id(match):
+    return next(g for g in match.groups() if g is not None) if match else None
+
+def _house_codes(text, patterns):
+    """(codes, bumpers in, bumpers out); bumpers are split around the first house code."""
+    codes = patterns['house_code'].findall(text)
+    bumper_in, bumper_out = '', ''
+    if codes and patterns['bumper']:
+        first_pos = patterns['house_code'].search(text).start()
+        bumpers = list(patterns['bumper'].finditer(text))
+        bumper_in = '|ad_break|'.join([b.group(0) for b in bumpers if b.start() < first_pos])
+        bumper_out = '|ad_break|'.join([b.group(0) for b in bumpers if b.start() > first_pos])
+    return codes, bumper_in, bumper_out
+
+def _parts(text):
+    """The cell with lines turned into commas, for rules that read it part by part."""
+    return text.replace('\n', ',')
+
+def _part_codes(text, patterns):
+    """
+    (codes, bumpers in, bumpers out) of the cell read part by part: a part is a code if
+    it starts with one, and a bumper is in or out by whether a code came before it.
+    """
+    house_codes, bumpers_in, bumpers_out = [], [], []
+    for part in (p.strip() for p in _parts(text).split(',')):
+        if not part:
+            continue
+        bg_match = patterns['part_broken_glass'].match(part)
+        if bg_match:
+            house_codes.append(bg_match.group(1))
+        elif patterns['house_code'].match(part):
+            house_codes.append(part)
+        elif patterns['bumper'] and patterns['bumper'].match(part):
+            (bumpers_out if house_codes else bumpers_in).append(part)
+    return house_codes, '|ad_break|'.join(bumpers_in), '|ad_break|'.join(bumpers_out)
+
+def _broken_glass(text, patterns):
+    match = patterns['broken_glass'].search(text)
+    return match.group(1) if match else None
+
+# Match type -> its result for one cell's upper-cased text
+MATCHERS = {
+    'media_list': lambda text, patterns: _list_id(MEDIA_LIST_PATTERN.search(text)),
+    'qt_media_list': lambda text, patterns: _list_id(QT_MEDIA_LIST_PATTERN.search(text)),
+    'socal_media_list': lambda text, patterns: _list_id(SOCAL_MEDIA_LIST_PATTERN.search(text)),
+    'socal_mention': lambda text, patterns: SOCAL_MENTION_PATTERN.search(text) is not None,
+    'broken_glass': _broken_glass,
+    'house_codes': _house_codes,
+    'part_qt_media_list': lambda text, patterns: _list_id(QT_MEDIA_LIST_PATTERN.search(_parts(text))),
+    'part_codes': _part_codes
+}
+
+class CellState(dict):
+    """One cell's match results, each computed the first time a rule reads it."""
+    __slots__ = ('text', 'patterns')
+
+    def __init__(self, text, patterns):
+        super().__init__()
+        self.text = text
+        self.patterns = patterns
+
+    def __missing__(self, match_type):
+        # Siblings may fill in the same entry at once; both compute the same value
+        value = self[match_type] = MATCHERS[match_type](self.text, self.patterns)
+        return value
+
+def _media_list(match_type):
+    return lambda state: (f"MEDIALIST{state[match_type]}", '', '') if state[match_type] is not None else None
+
+def _code_block(match_type):
+    def rule(state):
+        codes, bumper_in, bumper_out = state[match_type]
+        return ('|ad_break|'.join(codes), bumper_in, bumper_out) if codes else None
+    return rule
+
+# Rule name -> rule. A rule returns the (house code, bumper in, bumper out) of the block a cell starts, or None.
+RULES = {
+    'media_list': _media_list('media_list'),
+    'qt_media_list': _media_list('qt_media_list'),
+    'socal_media_list': _media_list('socal_media_list'),
+    # Broken glass is only scheduled when the cell also has a SoCal media list
+    'socal_broken_glass': lambda state: (state['broken_glass'], '', '') if state['socal_mention'] and state['broken_glass'] else None,
+    'house_codes': _code_block('house_codes'),
+    'part_qt_media_list': _media_list('part_qt_media_list'),
+    'part_codes': _code_block('part_codes')
+}
+
+# processing_logic -> the rules of a channel that doesn't list its own. Unknown values use 'standard'.
+RULE_PRESETS = {
+    'standard': ['media_list', 'qt_media_list', 'house_codes'],
+    'pll domestic': ['part_qt_media_list', 'part_codes'],
+    'slvr': ['socal_broken_glass', 'media_list', 'house_codes'],
+    'slvr socal': ['socal_media_list', 'media_list', 'house_codes']
+}
+
+def rules_for(config):
+    """The channel's ordered rule names; 'ignore_media_list_rule' drops the media list rules."""
+    rules = config.get('parse_rules') or RULE_PRESETS.get(config.get('processing_logic'), RULE_PRESETS['standard'])
+    unknown = [rule for rule in rules if rule not in RULES]
+    if unknown:
+        raise ValueError(f"Unknown parse rules for {config.get('output_prefix')}: {', '.join(unknown)}")
+    if config.get('ignore_media_list_rule', False):
+        rules = [rule for rule in rules if rule not in ('media_list', 'qt_media_list')]
+    return rules
+
+def compile_rules(config):
+    """The channel's rules as one function from a cell state to the block it starts, or None."""
+    rules = [RULES[rule] for rule in rules_for(config)]
+    def first_block(state):
+        for rule in rules:
+            block = rule(state)
+            if block:
+                return block
+        return None
+    return first_block
+
+def classify_grid(grid_data, days, config):
+    """The cell-state table of the given day columns: day -> one state per row, or None for an empty cell."""
+    patterns = compile_patterns(config['house_code_pattern'], config.get('bumper_pattern'))
+    table = {}
+    for day in days:
+        states = []
+        for cell in grid_data[day].tolist():
+            text = str(cell).upper().strip()
+            states.append(CellState(text, patterns) if text else None)
+        table[day] = states
+    return table
+
+class BlockStore:
+    """
+    The blocks of a parse, column by column. Codes are indexes into one interned code
+    table and start times are grid rows, so a block costs a few machine integers instead
+    of a dict, and the frame is built a column at a time. Blocks are appended a day at a
+    time; day_rows gives a day's row range in the frame.
+    """
+    COLUMNS = ['House Code', 'Bumper In', 'Bumper Out', 'Duration (minutes)', 'Air Date', 'Start Time']
+    __slots__ = ('start_times', 'codes', '_code_ids', 'house_codes', 'bumpers_in', 'bumpers_out', 'durations', 'rows', 'days')
+
+    def __init__(self, start_times):
+        self.start_times = start_times
+        self.codes = []
+        self._code_ids = {}
+        self.house_codes, self.bumpers_in, self.bumpers_out = array('l'), array('l'), array('l')
+        self.durations, self.rows = array('l'), array('l')
+        self.days = {}  # day -> (first row, end row)
+
+    def __len__(self):
+        return len(self.durations)
+
+    def _code_id(self, code):
+        code_id = self._code_ids.get(code)
+        if code_id is None:
+            code_id = self._code_ids[code] = len(self.codes)
+            self.codes.append(code)
+        return code_id
+
+    def append(self, block, duration, row):
+        house_code, bumper_in, bumper_out = block
+        self.house_codes.append(self._code_id(house_code))
+        self.bumpers_in.append(self._code_id(bumper_in))
+        self.bumpers_out.append(self._code_id(bumper_out))
+        self.durations.append(duration)
+        self.rows.append(row)
+
+    def end_day(self, day, first):
+        self.days[day] = (first, len(self))
+
+    def day_rows(self, day):
+        return self.days.get(day, (0, 0))
+
+    def to_frame(self):
+        """The blocks as the programming DataFrame; empty, without columns, when there are none."""
+        if not len(self):
+            return pd.DataFrame()
+        codes = np.array(self.codes, dtype=object)
+        days, lengths = zip(*((day, end - first) for day, (first, end) in self.days.items()))
+        return pd.DataFrame({
+            'House Code': codes[np.asarray(self.house_codes)],
+            'Bumper In': codes[np.asarray(self.bumpers_in)],
+            'Bumper Out': codes[np.asarray(self.bumpers_out)],
+            'Duration (minutes)': np.asarray(self.durations, dtype=np.int64),
+            'Air Date': np.repeat(np.array(days, dtype=object), lengths),
+            'Start Time': np.array(self.start_times, dtype=object)[np.asarray(self.rows)]
+        }, columns=self.COLUMNS)
+
+def build_blocks(grid_data, days, cell_states, config):
+    """
+    Applies the channel's rules to the cell states and returns a BlockStore. A block runs
+    from the cell that starts it to the next one, or to the end of the day, in 30-minute rows.
+    """
+    first_block = compile_rules(config)
+    rule_set = (tuple(rules_for(config)), config['house_code_pattern'], config.get('bumper_pattern'))
+    blocks = BlockStore(grid_data['Start Time'].tolist())
+    lookups = {'hit': 0, 'miss': 0}
+    for day in days:
+        states = cell_states[day]
+        first = len(blocks)
+        prev_index, prev_block = None, None
+        for index, state in enumerate(states):
+            block = _parse_cell(state, rule_set, first_block, lookups) if state is not None else None
+            if block:
+                if prev_block:
+                    blocks.append(prev_block, (index - prev_index) * 30, prev_index)
+                prev_index, prev_block = index, block
+        if prev_block:
+            blocks.append(prev_block, (len(states) - prev_index) * 30, prev_index)
+        blocks.end_day(day, first)
+    for result, count in lookups.items():
+        if count:
+            CACHE_REQUESTS.inc(count, cache='cell_parse', result=result)
+    return blocks
+
+def _parse_cell(state, rule_set, first_block, lookups):
+    """The block a cell starts, from the LRU cache when a channel with the same rule set has seen the text."""
+    key = (rule_set, state.text)
+    with _cell_cache_lock:
+        block = _cell_cache.get(key, _NOT_CACHED)
+        if block is not _NOT_CACHED:
+            _cell_cache.move_to_end(key)
+            lookups['hit'] += 1
+            return block
+    lookups['miss'] += 1
+    block = first_block(state)
+    with _cell_cache_lock:
+        _cell_cache[key] = block
+        while len(_cell_cache) > CELL_CACHE_MAX_ENTRIES:
+            _cell_cache.popitem(last=False)
+    return block
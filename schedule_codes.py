@@ -0,0 +1,179 @@
+import re
+import sys
+import time
+import random
+import argparse
+from collections import deque
+
+# Multi-pattern code scanner. Every channel's house code and bumper pattern is an
+# alternation of literal prefixes with a digit suffix (PLL\d+, SLVRBUMP\d+, and ACL's
+# dotted AROUND_THE_ACL_\d+\.\d+\.\d+), so a cell can be scanned once with an
+# Aho-Corasick automaton over all the prefixes. Each prefix hit is checked for its suffix
+# and becomes a typed token: (start, end, kind, code, labels).
+#
+#   python schedule_codes.py scan "SLVRBUMP1 EGH12 / CCA3"
+#   python schedule_codes.py bench
+
+DIGITS = re.compile(r'\d+')
+
+def split_alternatives(pattern):
+    """
+    (prefix, suffix) of each alternative of a '(PREFIX\\d+|...)' pattern, in order. Raises
+    ValueError for a pattern that isn't a plain alternation of literal prefixes.
+    """
+    body = pattern[1:-1] if pattern.startswith('(') and pattern.endswith(')') else pattern
+    terms = []
+    for alternative in body.split('|'):
+        match = re.fullmatch(r'([A-Z_]+)(\\d\+(?:\\\.\\d\+)*)', alternative)
+        if not match:
+            raise ValueError(f"Not a literal prefix and digit suffix: {alternative!r} in {pattern!r}")
+        terms.append((match.group(1), match.group(2)))
+    return terms
+
+class CodeScanner:
+    """
+    Scans text for every code of a set of patterns in one pass. patterns is a list of
+    (kind, label, pattern); a prefix shared by several labels of one kind is one entry.
+    """
+    def __init__(self, patterns):
+        self.entries = []  # (prefix, suffix regex or None for \d+, kind, labels)
+        entry_ids = {}
+        for kind, label, pattern in patterns:
+            for prefix, suffix in split_alternatives(pattern):
+                key = (prefix, suffix, kind)
+                if key in entry_ids:
+                    prefix, suffix, kind, labels = self.entries[entry_ids[key]]
+                    self.entries[entry_ids[key]] = (prefix, suffix, kind, labels + (label,))
+                    continue
+                entry_ids[key] = len(self.entries)
+                self.entries.append((prefix, None if suffix == r'\d+' else re.compile(suffix), kind, (label,)))
+        self._build_automaton()
+
+    def _build_automaton(self):
+        goto, outputs = [{}], [[]]
+        for entry_id, entry in enumerate(self.entries):
+            state = 0
+            for char in entry[0]:
+                if char not in goto[state]:
+                    goto.append({})
+                    outputs.append([])
+                    goto[state][char] = len(goto) - 1
+                state = goto[state][char]
+            outputs[state].append(entry_id)
+
+        # Breadth first, so each state's fail state is complete before its children's
+        fail = [0] * len(goto)
+        self._delta = [dict(goto[0])] + [None] * (len(goto) - 1)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            outputs[state] = outputs[state] + outputs[fail[state]]
+            self._delta[state] = {**self._delta[fail[state]], **goto[state]}
+            for char, child in goto[state].items():
+                fail[child] = self._delta[fail[state]].get(char, 0)
+                queue.append(child)
+        self._outputs = [tuple(entry_ids) for entry_ids in outputs]
+        self._prefix_lengths = [len(entry[0]) for entry in self.entries]
+
+    def scan(self, text):
+        """Every code in text, overlapping ones included, in order of where their prefix ends."""
+        tokens = []
+        delta, outputs, entries, lengths = self._delta, self._outputs, self.entries, self._prefix_lengths
+        state = 0
+        for position, char in enumerate(text):
+            state = delta[state].get(char, 0)
+            if outputs[state]:
+                for entry_id in outputs[state]:
+                    suffix = entries[entry_id][1] or DIGITS
+                    match = suffix.match(text, position + 1)
+                    if match:
+                        start = position + 1 - lengths[entry_id]
+                        tokens.append((start, match.end(), entries[entry_id][2], text[start:match.end()], entries[entry_id][3]))
+        return tokens
+
+    def select(self, tokens, kind, label=None):
+        """
+        The tokens of one kind (and label) that the pattern's regex finds with findall:
+        leftmost first and without overlaps. Two prefixes of letters can't both start a
+        code at one position, since a code continues with a digit; a prefix with several
+        suffixes yields its tokens in pattern order, which the stable sort keeps.
+        """
+        selected, end = [], 0
+        for token in sorted(tokens, key=lambda token: token[0]):
+            if token[2] == kind and (label is None or label in token[4]) and token[0] >= end:
+                selected.append(token)
+                end = token[1]
+        return selected
+
+def channel_patterns(channel_config):
+    """(kind, channel, pattern) of every house code and bumper pattern in the config."""
+    patterns = []
+    for name, config in channel_config.items():
+        patterns.append(('house', name, config['house_code_pattern']))
+        if config.get('bumper_pattern'):
+            patterns.append(('bumper', name, config['bumper_pattern']))
+    return patterns
+
+def dense_cells(channel_config, count, codes_per_cell, seed=0):
+    """Cells packed with codes of every channel, joined the ways grid cells join them."""
+    rng = random.Random(seed)
+    prefixes = [(prefix, suffix) for _, _, pattern in channel_patterns(channel_config) for prefix, suffix in split_alternatives(pattern)]
+    def code():
+        prefix, suffix = rng.choice(prefixes)
+        return prefix + (str(rng.randint(1, 999)) if suffix == r'\d+' else ".".join(str(rng.randint(1, 99)) for _ in range(3)))
+    return [rng.choice([" ", ", ", " / ", "\n"]).join(code() for _ in range(codes_per_cell)) for _ in range(count)]
+
+def _best_of(repeats, function):
+    best = float('inf')
+    for _ in range(repeats):
+        started = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+def bench(channel_config, cells, repeats=5):
+    """
+    Microseconds per cell: every channel's codes from one scan against one alternation
+    regex of all the patterns, and one channel's house codes and bumpers (the parser's
+    work) against its findall/finditer pair.
+    """
+    scanner = CodeScanner(channel_patterns(channel_config))
+    combined = re.compile("|".join(f"(?P<{kind}_{index}>{pattern})" for index, (kind, _, pattern) in enumerate(channel_patterns(channel_config))))
+    results = {
+        'all channels: scanner': _best_of(repeats, lambda: [scanner.scan(cell) for cell in cells]),
+        'all channels: alternation regex': _best_of(repeats, lambda: [list(combined.finditer(cell)) for cell in cells])
+    }
+    for name, config in channel_config.items():
+        channel_scanner = CodeScanner([('house', name, config['house_code_pattern'])] + ([('bumper', name, config['bumper_pattern'])] if config.get('bumper_pattern') else []))
+        house, bumper = re.compile(config['house_code_pattern']), re.compile(config.get('bumper_pattern') or '(?!)')
+        def with_scanner():
+            for cell in cells:
+                tokens = channel_scanner.scan(cell)
+                channel_scanner.select(tokens, 'house'), channel_scanner.select(tokens, 'bumper')
+        results[f'{name}: scanner'] = _best_of(repeats, with_scanner)
+        results[f'{name}: regex'] = _best_of(repeats, lambda: [(house.findall(cell), list(bumper.finditer(cell))) for cell in cells])
+    return {label: seconds / len(cells) * 1e6 for label, seconds in results.items()}
+
+def main():
+    from schedule_engine import CHANNEL_CONFIG
+    parser = argparse.ArgumentParser(description="Scan text for every channel's house codes and bumpers.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    scan_parser = commands.add_parser("scan", help="Print the codes found in a cell.")
+    scan_parser.add_argument("text")
+    bench_parser = commands.add_parser("bench", help="Time the scanner against the alternation regexes on dense cells.")
+    bench_parser.add_argument("--cells", type=int, default=2000)
+    bench_parser.add_argument("--codes-per-cell", type=int, default=12)
+    args = parser.parse_args()
+
+    if args.command == "scan":
+        scanner = CodeScanner(channel_patterns(CHANNEL_CONFIG))
+        for start, end, kind, code, labels in sorted(scanner.scan(args.text.upper())):
+            print(f"{start:>4} {end:>4}  {kind:<6} {code:<24} {', '.join(labels)}")
+        return
+    cells = dense_cells(CHANNEL_CONFIG, args.cells, args.codes_per_cell)
+    print(f"{args.cells} cells of {args.codes_per_cell} codes ({sum(map(len, cells)) / len(cells):.0f} characters on average)", file=sys.stderr)
+    for label, micros in bench(CHANNEL_CONFIG, cells).items():
+        print(f"{label:<40} {micros:8.2f} us/cell")
+
+if __name__ == "__main__":
+    main()
@@ -323,7 +323,7 @@ output_path = downloads_folder
 output_file = f'{downloads_folder}/BilliardTVProgrammingSheet({sheet_id}).csv'
 
 # Construct the export URL for the specific sheet/tab
-url = f"https://docs.google.com/spreadsheets/d/{spreadsheet_id}/gviz/tq?tqx=out:csv&sheet={sheet_id}"
+url = f"{os.environ.get('GVIZ_BASE_URL', 'https://docs.google.com')}/spreadsheets/d/{spreadsheet_id}/gviz/tq?tqx=out:csv&sheet={sheet_id}"
 
 # Send a GET request to the URL
 response = requests.get(url)
@@ -237,7 +237,7 @@ if __name__ == "__main__":
     spreadsheet_id = '1qLC9nSmQHB7pd8lIEe6NXyQzs_49mSnWv53I4cq6EcQ'
     sheet_name = week_name.upper()
     temp_download_file = os.path.join(downloads_folder, f'temp_PLL_Domestic_Grid_{sheet_name}.csv')
-    url = f"https://docs.google.com/spreadsheets/d/{spreadsheet_id}/gviz/tq?tqx=out:csv&sheet={sheet_name}"
+    url = f"{os.environ.get('GVIZ_BASE_URL', 'https://docs.google.com')}/spreadsheets/d/{spreadsheet_id}/gviz/tq?tqx=out:csv&sheet={sheet_name}"
 
     print(f"\n⚙️  Processing Domestic schedule for week: {sheet_name}...")
     print("Downloading grid from Google Sheets...")
@@ -0,0 +1,1056 @@
+import os
+import sys
+import io
+import csv
+import heapq
+import sqlite3
+import hashlib
+import time
+import threading
+import requests
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+from contextlib import contextmanager
+from functools import total_ordering
+from operator import itemgetter
+from datetime import datetime, timedelta
+from concurrent.futures import Future, ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from schedule_metrics import CACHE_REQUESTS, CHANNEL_PROCESSING_SECONDS, GRID_DOWNLOAD_FAILURES
+from schedule_events import begin_run, emit_event, end_run, new_run_id
+import schedule_archive
+from schedule_cells import build_blocks, classify_grid
+from schedule_limits import REPEAT_LOOKBACK_WEEKS, REPEAT_MAX_AIRINGS, REPEAT_MIN_GAP_HOURS, VALID_DURATIONS, parse_airtime
+import schedule_autofill
+
+# Channel Config
+CHANNEL_CONFIG = {
+    "ACL": {
+        "spreadsheet_id": "1iAnFLY7npmqf-fpY0Odw7ugvBBU8k_UrM06KLt0maw4",
+        "linear_channel_id": 2802,
+        "house_code_pattern": r'(CORN\d+|CORNFILL\d+|AROUND_THE_ACL_\d+\.\d+\.\d+)',
+        "bumper_pattern": r'(ACLBUMP\d+)',
+        "output_prefix": "ACL",
+        "processing_logic": "standard"
+    },
+    "Bark": {
+        "spreadsheet_id": "1jfZJjaA8oDSbFfInDwxQfvEEFTPWT5L58vXujBuwptw",
+        "linear_channel_id": 850,
+        "house_code_pattern": r'(BARK\d+|BARKFILL\d+)',
+        "bumper_pattern": r'(BARKBUMP\d+)',
+        "output_prefix": "BarkTV",
+        "processing_logic": "standard"
+    },
+    "Billiard": {
+        "spreadsheet_id": '1Y6Y6OsYEj0d0jEOgyU4E7gw-PelUdNMKl9VWjvKTlF0',
+        "linear_channel_id": 178,
+        "house_code_pattern": r'(BILL\d+|BILLFILL\d+)',
+        "bumper_pattern": r'(BILLBUMP\d+)',
+        "output_prefix": "BilliardTV",
+        "processing_logic": "standard"
+    },
+    "Bowling": {
+        "spreadsheet_id": '1yj4FjX1uv3irJbftSGTP-xCdZhtovoP1f3RCdRk-cek',
+        "linear_channel_id": 7487,
+        "house_code_pattern": r'(BOWL\d+|BOWLFILL\d+)',
+        "bumper_pattern": r'(BOWLBUMP\d+)',
+        "output_prefix": "BowlingTV",
+        "processing_logic": "standard"
+    },
+    #RIP BOXING
+    #"Boxing": {
+    #    "spreadsheet_id": '1jdMKwExqP3g0KpmCTrbOdxS74eAHLaeIsZPb-00NgT0',
+    #    "linear_channel_id": 2797,
+    #    "house_code_pattern": r'(BOX\d+|BOXFILL\d+)',
+    #    "bumper_pattern": r'(BOXBUMP\d+)',
+    #    "output_prefix": "BoxingTV",
+    #    "processing_logic": "standard"
+    #},
+    "PLL Domestic": {
+        "spreadsheet_id": '1qLC9nSmQHB7pd8lIEe6NXyQzs_49mSnWv53I4cq6EcQ',
+        "linear_channel_id": 9,
+        "house_code_pattern": r'(MPLS_EP\d+|PLL\d+|PLLFILL\d+|MPLS\d+)',
+        "bumper_pattern": r'(PLLBUMP\d+)',
+        "hourly_promo_in": "6139",
+        "hourly_promo_out": "6336",
+        "output_prefix": "PLL_Dom",
+        "processing_logic": "pll domestic",
+        "parse_rules": ["part_qt_media_list", "part_codes"]
+    },
+    "PLL International": {
+        "derived_from": "PLL Domestic",
+        "linear_channel_id": 176,
+        "output_prefix": "PLL_Int",
+        "processing_logic": "standard",
+        "parse_rules": ["media_list", "qt_media_list", "house_codes"]
+    },
+    "PowerSports World": {
+        "spreadsheet_id": '116ZbKMMQxROJX3YjFyxtauhFVkx5GgcHeSBYLk78GJg',
+        "linear_channel_id": 2800,
+        "house_code_pattern": r'(PSW\d+|PSWFILL\d+)',
+        "bumper_pattern": r'(PSWBUMP\d+)',
+        "output_prefix": "PSW",
+        "processing_logic": "standard"
+    },
+    "SLVR": {
+        "spreadsheet_id": '1Vi6vr5lI41SM9yV4y0HVeq0tMreJmhMp4s1coVKPTHw',
+        "linear_channel_id": 7260,
+        "house_code_pattern": r'(EGH\d+|SLVR\d+|EGHFILL\d+|SLVRFILL\d+|SBAW\d+|CCA\d+|SGIHL\d+|SNHLR\d+|SNHLP\d+|FBLJK\d+|SETH\d+|SLACH\d+|SSWING\d+|SKSIX\d+|SGOAT\d+|SROYAL\d+|SATKM\d+)',
+        "bumper_pattern": r'(EGHBUMP\d+|SLVRBUMP\d+)',
+        "output_prefix": "SLVR",
+        "processing_logic": "slvr",
+        "parse_rules": ["socal_broken_glass", "media_list", "house_codes"]
+    },
+    "SLVR SoCal": {
+        "derived_from": "SLVR",
+        "linear_channel_id": 7790,
+        "output_prefix": "SLVR_SOCAL",
+        "processing_logic": "slvr socal",
+        "parse_rules": ["socal_media_list", "media_list", "house_codes"]
+    },
+}
+
+def _resolve_derived_channels(channel_config):
+    """
+    A derived channel reads the same grid as its 'derived_from' channel and lists only the
+    keys it changes; the rest of its config is filled in from that channel.
+    """
+    for name, config in channel_config.items():
+        if 'derived_from' in config:
+            channel_config[name] = {**channel_config[config['derived_from']], **config}
+
+_resolve_derived_channels(CHANNEL_CONFIG)
+
+def grid_siblings(config):
+    """The configs in CHANNEL_CONFIG that read the same spreadsheet with the same code patterns as config."""
+    return [other for other in CHANNEL_CONFIG.values()
+            if (other['spreadsheet_id'], other['house_code_pattern'], other.get('bumper_pattern')) == (config['spreadsheet_id'], config['house_code_pattern'], config.get('bumper_pattern'))]
+
+# Shared HTTP connection pool for grid downloads, so concurrent channels and weeks
+# re-use keep-alive connections instead of opening a new one per request.
+HTTP_POOL_SIZE = 16
+HTTP_SESSION = requests.Session()
+HTTP_SESSION.mount("https://", HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE))
+HTTP_SESSION.mount("http://", HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE))
+
+# Grid downloads go to Google Sheets unless pointed at a stand-in (see schedule_gviz_stub.py).
+GVIZ_BASE_URL = os.environ.get("GVIZ_BASE_URL", "https://docs.google.com").rstrip('/')
+
+# Last content per tab URL with its ETag, so a server that sends ETags can answer a
+# re-download with 304 Not Modified instead of the whole tab.
+ETAG_CACHE_MAX_ENTRIES = 128
+_etag_cache = {}
+_etag_cache_lock = threading.Lock()
+
+# Parsed library index, shared by every engine in the process and keyed by content hash.
+LIBRARY_CACHE_MAX_ENTRIES = 4
+_library_cache = {}
+_library_cache_lock = threading.Lock()
+
+BATCH_MAX_WORKERS = int(os.environ.get("BATCH_MAX_WORKERS", "8"))
+
+DATE_FORMATS = ["%Y-%m-%d", "%m%d%Y", "%m/%d/%Y", "%m-%d-%Y", "%m%d%y", "%m/%d/%y", "%m-%d-%y"]
+
+def parse_input_date(input_date_str):
+    """Parses a date in any of the supported formats, returning None if none match."""
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(input_date_str, date_format)
+        except ValueError:
+            continue
+    return None
+
+def get_week_starts(start_date_str, end_date_str=None):
+    """Returns the Monday of every week between the two dates (inclusive) as YYYY-MM-DD strings."""
+    start_date = parse_input_date(start_date_str)
+    end_date = parse_input_date(end_date_str) if end_date_str else start_date
+    if start_date is None or end_date is None:
+        raise ValueError(f"Invalid date range: {start_date_str} to {end_date_str}.")
+    if end_date < start_date:
+        raise ValueError("The end date must not be before the start date.")
+    week_start = start_date - timedelta(days=start_date.weekday())
+    week_starts = []
+    while week_start <= end_date:
+        week_starts.append(week_start.strftime("%Y-%m-%d"))
+        week_start += timedelta(weeks=1)
+    return week_starts
+
+def count_cache_lookup(cache, result):
+    """Counts a cache hit or miss in the metrics and the current run's event stream."""
+    CACHE_REQUESTS.inc(cache=cache, result=result)
+    emit_event('cache', cache=cache, result=result)
+
+def library_key(library_file_content):
+    return hashlib.sha1(library_file_content.encode()).hexdigest()
+
+def load_library(library_file_content):
+    """
+    Reads the library CSV and keeps the latest node ID per legacy_id. The result is cached
+    by content hash so every channel and week in the process shares one parsed index.
+    """
+    key = library_key(library_file_content)
+    with _library_cache_lock:
+        if key in _library_cache:
+            count_cache_lookup('library', 'hit')
+            return _library_cache[key]
+        count_cache_lookup('library', 'miss')
+        df = pd.read_csv(io.StringIO(library_file_content))
+        if 'legacy_id' not in df.columns or 'id' not in df.columns:
+            raise KeyError("Library sheet must contain 'legacy_id' and 'id' columns.")
+        df_sorted = df.sort_values(by=['legacy_id', 'id'], ascending=[True, False])
+        library_df = df_sorted.drop_duplicates(subset=['legacy_id'], keep='first')
+        while len(_library_cache) >= LIBRARY_CACHE_MAX_ENTRIES:
+            _library_cache.pop(next(iter(_library_cache)))
+        _library_cache[key] = library_df
+        return library_df
+
+class GridCache:
+    """
+    Compute-once cache for the engines of one batch. Sibling channels that read the same
+    spreadsheet tab (PLL Domestic/International, SLVR/SLVR SoCal) and concurrent requests
+    for the same tab wait on a single download, and siblings share one cell-state table.
+    """
+    def __init__(self):
+        self._futures = {}
+        self._lock = threading.Lock()
+
+    def _get_once(self, cache, key, compute):
+        with self._lock:
+            future = self._futures.get((cache, key))
+            is_owner = future is None
+            if is_owner:
+                future = self._futures[(cache, key)] = Future()
+        count_cache_lookup(cache, 'miss' if is_owner else 'hit')
+        if is_owner:
+            try:
+                future.set_result(compute())
+            except Exception as e:
+                future.set_exception(e)
+        return future.result()
+
+    def get(self, key, download):
+        return self._get_once('grid', key, download)
+
+    def cell_states(self, key, classify):
+        return self._get_once('cell_state', key, classify)
+
+# Incremental parsing: the last prepared grid per (channel, week) is kept so that a re-run
+# during a fix cycle only re-parses and re-validates the day columns that were edited.
+INCREMENTAL_PARSE = os.environ.get("INCREMENTAL_PARSE", "1") != "0"
+GRID_CACHE_MAX_ENTRIES = 64
+_grid_cache = {}
+_grid_cache_lock = threading.Lock()
+
+# Validation finding codes in the event stream that halt a run; the others are warnings.
+CRITICAL_FINDINGS = ('zero_duration_content', 'unmatched_house_code')
+
+class ProcessingEngine:
+    def __init__(self, config, input_date_str, library_file_content, incremental=None, grid_cache=None):
+        self.config = config
+        self.input_date_str = input_date_str
+        self.library_file_content = library_file_content
+        self.incremental = INCREMENTAL_PARSE if incremental is None else incremental
+        self.grid_cache = grid_cache
+        self.logs = [] # A new list to store log messages
+        self.unmatched_ids = []
+        self.premature_mpls = []
+        self.cached_entry = None
+        self.changed_days = []
+        self.day_blocks = {}
+        self.stage_timings = []
+        self.run_id = None
+        self.airtime_index = None
+        self.error_codes = []
+        self.finding_counts = {}
+
+    @contextmanager
+    def _stage(self, name):
+        """
+        Times one pipeline stage in wall and CPU time. The caller may set 'rows' on the
+        yielded record; a stage entered twice in a run is added to its first record.
+        """
+        record = next((timing for timing in self.stage_timings if timing['stage'] == name), None)
+        if record is None:
+            record = {'stage': name, 'wall_seconds': 0.0, 'cpu_seconds': 0.0, 'rows': None}
+            self.stage_timings.append(record)
+        wall_started, cpu_started = time.perf_counter(), time.thread_time()
+        rows_before = record['rows']
+        try:
+            yield record
+        finally:
+            wall_seconds, cpu_seconds = time.perf_counter() - wall_started, time.thread_time() - cpu_started
+            record['wall_seconds'] += wall_seconds
+            record['cpu_seconds'] += cpu_seconds
+            emit_event('stage', stage=name, wall_seconds=round(wall_seconds, 4), cpu_seconds=round(cpu_seconds, 4),
+                       rows=record['rows'] if record['rows'] != rows_before else None)
+
+    def _begin_run(self, mode):
+        """Starts the run's event stream; every event until _finish_run carries its run_id."""
+        self.run_id = new_run_id()
+        self._event_token = begin_run(run_id=self.run_id, channel=self.config['output_prefix'], input_date=self.input_date_str, mode=mode)
+        emit_event('run_start', incremental=self.incremental)
+
+    def _finish_run(self, mode, succeeded):
+        self._report_stage_timings(mode, succeeded)
+        if succeeded:
+            outcome = 'ok'
+        elif self.error_codes:
+            outcome = 'error'
+        else:
+            outcome = 'halted' if any(self.finding_counts.get(code) for code in CRITICAL_FINDINGS) else 'failed'
+        emit_event('run_end', succeeded=succeeded, outcome=outcome,
+                   wall_seconds=round(sum(timing['wall_seconds'] for timing in self.stage_timings), 4),
+                   cpu_seconds=round(sum(timing['cpu_seconds'] for timing in self.stage_timings), 4),
+                   stages=[{**timing, 'wall_seconds': round(timing['wall_seconds'], 4), 'cpu_seconds': round(timing['cpu_seconds'], 4)} for timing in self.stage_timings],
+                   errors=self.error_codes, findings=self.finding_counts)
+        end_run(self._event_token)
+
+    def _error_event(self, code, **fields):
+        """Records an error in the event stream; the message for people still goes to self.log."""
+        self.error_codes.append(code)
+        emit_event('error', code=code, **fields)
+
+    def _finding_event(self, code, **fields):
+        self.finding_counts[code] = self.finding_counts.get(code, 0) + 1
+        emit_event('finding', code=code, severity='critical' if code in CRITICAL_FINDINGS else 'warning', **fields)
+
+    def _report_stage_timings(self, mode, succeeded):
+        """Adds a one-line timing summary to the log; the structured timings are the run's stage events."""
+        if not self.stage_timings:
+            return
+        wall_total = sum(timing['wall_seconds'] for timing in self.stage_timings)
+        cpu_total = sum(timing['cpu_seconds'] for timing in self.stage_timings)
+        stages = ", ".join(
+            f"{timing['stage']} {timing['wall_seconds']:.2f}s" + (f" ({timing['rows']})" if timing['rows'] is not None else "")
+            for timing in self.stage_timings
+        )
+        self.log(f"⏱ {stages} | total {wall_total:.2f}s wall, {cpu_total:.2f}s CPU")
+        CHANNEL_PROCESSING_SECONDS.observe(wall_total, channel=self.config['output_prefix'], mode=mode)
+
+    # --- MODIFIED: The log() method now appends to the internal list ---
+    def log(self, message):
+        """Adds a log message to an internal list instead of posting to Slack."""
+        self.logs.append(message)
+
+    # --- REVISION 1: The run() method now RETURNS the DataFrame instead of uploading it. ---
+    def run(self):
+        final_df = None
+        self._begin_run('run')
+        try:
+            with self._stage('date'):
+                week_name, input_date = self._get_week_name_of_input_date(self.input_date_str)
+            if not week_name: return None
+
+            with self._stage('download') as stage:
+                grid_content = self._fetch_grid(self.config['spreadsheet_id'], week_name.upper())
+                stage['rows'] = grid_content.count(b'\n') if grid_content else 0
+            if grid_content is None: return None
+
+            with self._stage('prepare') as stage:
+                grid_data = self._prepare_grid_data(grid_content, input_date)
+                stage['rows'] = len(grid_data)
+            with self._stage('parse') as stage:
+                programming_df = self._parse_programming(grid_data, week_name)
+                stage['rows'] = len(programming_df)
+            
+            self.log("Getting OTTera node IDs...")
+            with self._stage('library') as stage:
+                library_df = self._filter_unique_rows_by_latest_date(self.library_file_content)
+                stage['rows'] = len(library_df)
+            if library_df.empty: return None
+
+            with self._stage('validate'):
+                findings = self._collect_findings_by_day(library_df) if self.incremental and not programming_df.empty else None
+            final_df = self._create_final_sheet(programming_df, library_df, findings)
+
+            # If the process failed, log it and return None
+            if final_df is None:
+                self.log(f"--- {self.config['output_prefix']} | {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} ---")
+                self.log("🚫 *PROCESS HALTED* for this channel due to validation errors found above.")
+                return None
+            
+            # On success, return the created DataFrame
+            return final_df
+
+        except Exception as e:
+            self._error_event('exception', exception=type(e).__name__, message=str(e))
+            self.log(f"\n--- A CRITICAL ERROR OCCURRED for {self.config['output_prefix']} ---\n`{e}`")
+            import traceback
+            self.log(f"```\n{traceback.format_exc()}\n```")
+            return None # Ensure we return None on a critical error
+        finally:
+            self._finish_run('run', final_df is not None)
+    
+    # --- The rest of your ProcessingEngine methods remain unchanged ---
+    def _filter_unique_rows_by_latest_date(self, csv_content):
+        try:
+            return load_library(csv_content)
+        except KeyError:
+            self._error_event('library_missing_columns')
+            self.log("ERROR: Library sheet must contain 'legacy_id' and 'id' columns.")
+            return pd.DataFrame()
+        except Exception as e:
+            self._error_event('library_unreadable', exception=type(e).__name__, message=str(e))
+            self.log(f"ERROR: Failed to read or process library CSV content: {e}")
+            return pd.DataFrame()
+        
+    def _get_week_name_of_input_date(self, input_date_str):
+        input_date = parse_input_date(input_date_str)
+        if not input_date:
+            self._error_event('invalid_date', value=input_date_str)
+            self.log(f"ERROR: Invalid date format: {input_date_str}. Please use a valid format.")
+            return None, None
+        start_of_week = input_date - timedelta(days=input_date.weekday())
+        end_of_week = start_of_week + timedelta(days=6)
+        week_start_month = start_of_week.strftime("%b")
+        week_end_month = end_of_week.strftime("%b")
+        week_name = f"{week_start_month} {start_of_week.day}-{week_end_month} {end_of_week.day}"
+        return week_name, start_of_week
+    
+    def _fetch_grid(self, spreadsheet_id, sheet_name):
+        """Returns the week tab's CSV bytes, going through the batch's grid cache if there is one."""
+        if self.grid_cache is None:
+            return self._download_sheet(spreadsheet_id, sheet_name)
+        logged_before = len(self.logs)
+        grid_content = self.grid_cache.get((spreadsheet_id, sheet_name), lambda: self._download_sheet(spreadsheet_id, sheet_name))
+        if grid_content is None and len(self.logs) == logged_before:
+            # Another channel made the failed download and holds the details in its log
+            self._error_event('grid_download_failed', sheet=sheet_name, shared=True)
+            self.log(f"ERROR: Could not get grid for '{sheet_name}'.")
+        return grid_content
+
+    def _download_sheet(self, spreadsheet_id, sheet_name):
+        """Downloads the week tab as CSV bytes through the shared session, or returns None."""
+        url = f"{GVIZ_BASE_URL}/spreadsheets/d/{spreadsheet_id}/gviz/tq?tqx=out:csv&sheet={sheet_name}"
+        with _etag_cache_lock:
+            cached = _etag_cache.get(url)
+        try:
+            response = HTTP_SESSION.get(url, headers={'If-None-Match': cached[0]} if cached else None, timeout=30)
+            if cached:
+                count_cache_lookup('etag', 'hit' if response.status_code == 304 else 'miss')
+            if response.status_code == 304 and cached:
+                return cached[1]
+            if response.status_code == 200:
+                etag = response.headers.get('ETag')
+                if etag:
+                    with _etag_cache_lock:
+                        _etag_cache.pop(url, None)
+                        while len(_etag_cache) >= ETAG_CACHE_MAX_ENTRIES:
+                            _etag_cache.pop(next(iter(_etag_cache)))
+                        _etag_cache[url] = (etag, response.content)
+                return response.content
+            else:
+                GRID_DOWNLOAD_FAILURES.inc(status=response.status_code)
+                self._error_event('grid_download_failed', sheet=sheet_name, status=response.status_code)
+                self.log(f"ERROR: Could not get grid for '{sheet_name}'.")
+                self.log(f"Status code: {response.status_code}. Response: {response.text[:200]}")
+                self.log("Please check if the Google Sheet exists and the tab name is correct.")
+                return None
+        except requests.exceptions.RequestException as e:
+            GRID_DOWNLOAD_FAILURES.inc(status='network_error')
+            self._error_event('grid_download_failed', sheet=sheet_name, status='network_error', message=str(e))
+            self.log(f"ERROR: A network error occurred while downloading the sheet: {e}")
+            return None
+        
+    def _prepare_grid_data(self, grid_content, start_date):
+        full_grid_data = pd.read_csv(io.BytesIO(grid_content))
+        grid_data = full_grid_data.iloc[:50].copy()
+        if grid_data.shape[1] > 8:
+            print("Warning: Found more than 8 columns in grid data. Truncating to the first 8.", file=sys.stderr)
+            grid_data = grid_data.iloc[:, :8]
+        #grid_data = grid_data.drop(grid_data.columns[[8]], axis=1, errors='ignore')
+        grid_data = grid_data.drop(grid_data.index[:2]).reset_index(drop=True)
+        week_dates = [(start_date + timedelta(days=i)).strftime("%m/%d/%Y") for i in range(7)]
+        week_dates.insert(0, 'Start Time')
+        grid_data.columns = week_dates
+        grid_data['Start Time'] = pd.to_datetime(grid_data['Start Time'], errors='coerce').dt.strftime('%H:%M')
+        grid_data = grid_data.fillna('')
+        return grid_data
+
+    def _collect_validation_findings(self, programming_df, library_df):
+        """Runs every check against the given blocks and returns the raw findings."""
+        # Call the helper methods you provided to get the raw error lists
+        unfit_durations = self._validate_slot_durations(programming_df, library_df)
+        zero_duration_content = self._check_zero_duration_content(programming_df, library_df)
+
+        # We must call _map_to_ids to populate self.unmatched_ids
+        self.unmatched_ids = []
+        # Gather all unique house codes from the schedule to check them at once
+        all_house_codes = pd.unique(programming_df[['House Code', 'Bumper In', 'Bumper Out']].values.ravel('K'))
+        all_house_codes_str = '|ad_break|'.join(filter(None, all_house_codes))
+        self._map_to_ids(all_house_codes_str, library_df)
+
+        return {
+            'unfit_durations': unfit_durations,
+            'zero_duration_content': zero_duration_content,
+            'unmatched_ids': list(self.unmatched_ids)
+        }
+
+    def _collect_findings_by_day(self, library_df):
+        """
+        Collects validation findings day by day, re-using the cached findings of the
+        days that did not change as long as the library is the same as last run.
+        """
+        current_library_key = library_key(self.library_file_content)
+        day_findings = {}
+        if self.cached_entry and self.cached_entry['library_key'] == current_library_key:
+            day_findings = {day: found for day, found in self.cached_entry['day_findings'].items() if day not in self.changed_days}
+
+        for day, day_df in self.day_blocks.items():
+            if day in day_findings:
+                continue
+            if day_df.empty:
+                day_findings[day] = {'unfit_durations': [], 'zero_duration_content': [], 'unmatched_ids': []}
+            else:
+                day_findings[day] = self._collect_validation_findings(day_df.reset_index(drop=True), library_df)
+
+        with _grid_cache_lock:
+            _grid_cache.pop(self.cache_key, None)
+            while len(_grid_cache) >= GRID_CACHE_MAX_ENTRIES:
+                _grid_cache.pop(next(iter(_grid_cache)))
+            _grid_cache[self.cache_key] = {
+                'grid': self.grid_data,
+                'day_blocks': self.day_blocks,
+                'day_findings': day_findings,
+                'library_key': current_library_key
+            }
+
+        findings = {'unfit_durations': [], 'zero_duration_content': [], 'unmatched_ids': []}
+        for day in self.day_blocks:
+            for key, values in day_findings[day].items():
+                findings[key].extend(values)
+        self.unmatched_ids = findings['unmatched_ids']
+        return findings
+
+    def _run_validations(self, programming_df, library_df, findings=None):
+        """
+        A dedicated method to run all checks and log the results with unique lists
+        for relevant errors.
+        """
+        self.log("Running validations...")
+        if findings is None:
+            findings = self._collect_validation_findings(programming_df, library_df)
+        unfit_durations = findings['unfit_durations']
+        zero_duration_content = findings['zero_duration_content']
+        content_repeats = self._report_only('repeat_check', self._check_content_repeats, programming_df)
+        fill_proposals = self._report_only('autofill', self._suggest_fills, programming_df, library_df, unfit_durations)
+        suggested_fills = {(proposal['Air Date'], proposal['Start Time']): proposal for proposal in fill_proposals if proposal['Reason'] == 'duration_mismatch'}
+
+        has_critical_errors = False
+
+        # For duration mismatches, each instance is reported with its unique date/time context.
+        if unfit_durations:
+            self.log("\n--- WARNING: DURATION MISMATCHES FOUND ---")
+            for unfit in unfit_durations:
+                content_duration_formatted = self._convert_seconds_to_hhmm(unfit['Content Duration (seconds)'])
+                slot_duration_formatted = self._convert_seconds_to_hhmm(unfit['Slot Duration (minutes)'] * 60)
+                valid_range_start, valid_range_end = unfit['Valid Range']
+                self._finding_event('duration_mismatch', house_code=unfit['House Code'], air_date=unfit['Air Date'], start_time=unfit['Start Time'],
+                                    content_seconds=unfit['Content Duration (seconds)'], slot_minutes=unfit['Slot Duration (minutes)'],
+                                    valid_range=[str(valid_range_start), str(valid_range_end)])
+                self.log(
+                    f"{unfit['House Code']} on {unfit['Air Date']} at {unfit['Start Time']}:\n"
+                    f"  > Content duration ({content_duration_formatted}) is outside the valid range for a {slot_duration_formatted} slot.\n"
+                    f"  > The valid duration range for this slot is between {valid_range_start} and {valid_range_end}."
+                )
+                suggestion = suggested_fills.get((unfit['Air Date'], unfit['Start Time']))
+                if suggestion and suggestion['Proposed Code']:
+                    self.log(f"  > Suggested fill: {suggestion['Proposed Code']} ({self._convert_seconds_to_hhmm(suggestion['Content Duration (seconds)'])}).")
+
+        empty_time = [proposal for proposal in fill_proposals if proposal['Reason'] == 'empty']
+        if empty_time:
+            self.log("\n--- WARNING: EMPTY TIME BEFORE THE FIRST BLOCK ---")
+            for proposal in empty_time:
+                suggestion = (f"suggested fill: {proposal['Proposed Code']} ({self._convert_seconds_to_hhmm(proposal['Content Duration (seconds)'])})"
+                              if proposal['Proposed Code'] else "no fill fits the channel's repeat limits")
+                self.log(f"{proposal['Air Date']} at {proposal['Start Time']} ({proposal['Slot Duration (minutes)']} min): {suggestion}.")
+
+        if content_repeats:
+            self.log("\n--- WARNING: CONTENT REPEATS FOUND ---")
+            for repeat in content_repeats:
+                if repeat['Kind'] == 'max_airings':
+                    self._finding_event('content_repeat', house_code=repeat['House Code'], kind='max_airings',
+                                        airings=repeat['Airings'], limit=repeat['Limit'], since=repeat['Since'])
+                    self.log(
+                        f"{repeat['House Code']} airs {repeat['Airings']} times since {repeat['Since']}:\n"
+                        f"  > The limit is {repeat['Limit']} airings in {REPEAT_LOOKBACK_WEEKS + 1} weeks."
+                    )
+                else:
+                    self._finding_event('content_repeat', house_code=repeat['House Code'], kind='min_gap',
+                                        air_date=repeat['Air Date'], start_time=repeat['Start Time'], gap_hours=repeat['Gap (hours)'], limit=repeat['Limit'])
+                    self.log(
+                        f"{repeat['House Code']} on {repeat['Air Date']} at {repeat['Start Time']}:\n"
+                        f"  > Re-airs {repeat['Gap (hours)']:g}h after {repeat['Previous Airing']}; the minimum gap is {repeat['Limit']:g}h."
+                    )
+
+        # --- REVISED: This section now reports a unique list of zero-duration codes ---
+        if zero_duration_content:
+            has_critical_errors = True
+            self.log("\n--- CRITICAL ERROR: ZERO DURATION CONTENT DETECTED ---")
+            # Use a dictionary to store unique house codes and an example mapped ID.
+            # This automatically handles duplicates.
+            unique_zero_duration = {
+                content['House Code']: content['Mapped IDs'] 
+                for content in zero_duration_content
+            }
+            # Format the unique codes into a single, clean string for the log.
+            error_list = sorted([f"{code} (ID: {uid})" for code, uid in unique_zero_duration.items()])
+            for code, uid in sorted(unique_zero_duration.items()):
+                self._finding_event('zero_duration_content', house_code=code, mapped_ids=str(uid))
+            self.log("The following house codes need reindexing: \n" + '\n'.join(error_list))
+        
+        # Reports a unique list of any house codes that were not found in the library.
+        if self.unmatched_ids:
+            has_critical_errors = True
+            self.log("\n--- CRITICAL ERROR: UNMATCHED HOUSE CODES (Not in library) ---")
+            # The 'set' automatically removes all duplicates from the list.
+            unique_unmatched = sorted(list(set(self.unmatched_ids)))
+            for code in unique_unmatched:
+                self._finding_event('unmatched_house_code', house_code=code)
+            self.log("The following house codes were not found: \n" + '\n'.join(unique_unmatched))
+        
+        # Reports a unique list of MPLS codes, if any were found.
+        if self.premature_mpls:
+            self.log("\n--- MANUAL SCHEDULING MAY BE REQUIRED ---")
+            unique_mpls = sorted(list(set(self.premature_mpls)))
+            for code in unique_mpls:
+                self._finding_event('mpls_manual_scheduling', house_code=code)
+            self.log("The following MPLS codes were found and should be verified: \n" + '\n'.join(unique_mpls))
+        
+        return has_critical_errors
+    
+    def validate_only(self):
+        """
+        Runs the entire process up to the validation step and reports the results
+        without generating a final CSV.
+        """
+        has_critical_errors = True
+        self._begin_run('validate_only')
+        try:
+            # Perform all the same initial steps as the run() method
+            with self._stage('date'):
+                week_name, input_date = self._get_week_name_of_input_date(self.input_date_str)
+            if not week_name: return False
+
+            with self._stage('download') as stage:
+                grid_content = self._fetch_grid(self.config['spreadsheet_id'], week_name.upper())
+                stage['rows'] = grid_content.count(b'\n') if grid_content else 0
+            if grid_content is None: return False
+
+            with self._stage('prepare') as stage:
+                grid_data = self._prepare_grid_data(grid_content, input_date)
+                stage['rows'] = len(grid_data)
+            with self._stage('parse') as stage:
+                programming_df = self._parse_programming(grid_data, week_name)
+                stage['rows'] = len(programming_df)
+            
+            with self._stage('library') as stage:
+                library_df = self._filter_unique_rows_by_latest_date(self.library_file_content)
+                stage['rows'] = len(library_df)
+            if library_df.empty: return False
+
+            # Run the validations and report the outcome
+            with self._stage('validate') as stage:
+                findings = self._collect_findings_by_day(library_df) if self.incremental and not programming_df.empty else None
+                has_critical_errors = self._run_validations(programming_df, library_df, findings)
+                stage['rows'] = len(programming_df)
+
+            if has_critical_errors:
+                self.log("\n🚫 Validation Failed.")
+            else:
+                self.log("\n✅ All validations passed successfully!")
+            
+            return not has_critical_errors
+
+        except Exception as e:
+            self._error_event('exception', exception=type(e).__name__, message=str(e))
+            self.log(f"\n--- A CRITICAL ERROR OCCURRED during validation for {self.config['output_prefix']} ---\n`{e}`")
+            import traceback
+            self.log(f"```\n{traceback.format_exc()}\n```")
+            return False
+        finally:
+            self._finish_run('validate_only', not has_critical_errors)
+
+    def _process_show_programming(self, grid_data, days, week_name):
+        """Builds the blocks of the given day columns with this channel's rule overlay, as a BlockStore."""
+        return build_blocks(grid_data, days, self._cell_states(grid_data, days, week_name), self.config)
+
+    def _cell_states(self, grid_data, days, week_name):
+        """
+        The grid's cell-state table. Channels with siblings in CHANNEL_CONFIG share one
+        table per week through the batch's grid cache, so whatever one of them matched in
+        a cell is there for the others; other channels classify just the days they parse.
+        """
+        if self.grid_cache is None or len(grid_siblings(self.config)) < 2:
+            return classify_grid(grid_data, days, self.config)
+        day_columns = tuple(grid_data.columns[1:8])
+        key = (self.config['spreadsheet_id'], week_name.upper(), day_columns, self.config['house_code_pattern'], self.config.get('bumper_pattern'))
+        return self.grid_cache.cell_states(key, lambda: classify_grid(grid_data, day_columns, self.config))
+
+    def _parse_programming(self, grid_data, week_name):
+        """
+        Parses the grid into programming blocks. In incremental mode the last prepared
+        grid for this channel and week is diffed cell by cell against the new one and
+        only the changed day columns are re-parsed; the rest come from the cache.
+        """
+        day_columns = list(grid_data.columns[1:8])
+        self.cache_key = (self.config['output_prefix'], week_name)
+        self.grid_data = grid_data
+        self.cached_entry = None
+        if self.incremental:
+            with _grid_cache_lock:
+                self.cached_entry = _grid_cache.get(self.cache_key)
+
+        cached_grid = self.cached_entry['grid'] if self.cached_entry else None
+        is_cache_hit = cached_grid is not None and cached_grid.columns.equals(grid_data.columns) and cached_grid['Start Time'].equals(grid_data['Start Time'])
+        if self.incremental:
+            count_cache_lookup('incremental_grid', 'hit' if is_cache_hit else 'miss')
+        if is_cache_hit:
+            self.changed_days = [day for day in day_columns if not grid_data[day].equals(cached_grid[day])]
+            self.day_blocks = dict(self.cached_entry['day_blocks'])
+            changed_cells = sum(int((grid_data[day] != cached_grid[day]).sum()) for day in self.changed_days)
+            self.log(f"Incremental parse: {len(self.changed_days)} of {len(day_columns)} days changed ({changed_cells} cells).")
+        else:
+            self.changed_days = day_columns
+            self.day_blocks = {}
+
+        if self.changed_days:
+            blocks = self._process_show_programming(grid_data, self.changed_days, week_name)
+            parsed_df = blocks.to_frame()
+            for day in self.changed_days:
+                first, end = blocks.day_rows(day)
+                self.day_blocks[day] = parsed_df.iloc[first:end] if end > first else pd.DataFrame()
+
+        day_frames = [self.day_blocks[day] for day in day_columns if not self.day_blocks[day].empty]
+        if not day_frames:
+            return pd.DataFrame()
+        return pd.concat(day_frames, ignore_index=True)
+
+    def _map_to_ids(self, house_code_str, library_sheet_df):
+        house_codes = house_code_str.split('|ad_break|')
+        mapped_ids = []
+        for house_code in house_codes:
+            if house_code.startswith('MEDIALIST'):
+                mapped_ids.append(house_code.replace('MEDIALIST', ''))
+            else:
+                match = library_sheet_df[library_sheet_df['legacy_id'] == house_code]['id']
+                if not match.empty:
+                    mapped_ids.append(str(match.iloc[0]))
+                elif house_code:
+                    if house_code not in self.unmatched_ids:
+                         self.unmatched_ids.append(house_code)
+                    mapped_ids.append('')
+        return '|ad_break|'.join(mapped_ids)
+    
+    def _create_final_sheet(self, programming_df, library_df, findings=None):
+        if programming_df.empty:
+            self._error_event('no_programming_blocks')
+            self.log("WARNING: No programming blocks were found in the grid. Halting process.")
+            return None
+
+        with self._stage('validate') as stage:
+            has_critical_errors = self._run_validations(programming_df, library_df, findings)
+            stage['rows'] = len(programming_df)
+        if has_critical_errors:
+            return None # Halt the process if critical errors are found
+              
+        self.log("All critical validations passed. Assembling final sheet...")
+        with self._stage('assemble') as stage:
+            output_df = self._assemble_output(programming_df, library_df)
+            stage['rows'] = len(output_df)
+        if schedule_archive.ARCHIVE_PATH:
+            with self._stage('archive') as stage:
+                self._archive_output(programming_df, output_df, library_df)
+                stage['rows'] = len(output_df)
+        return output_df
+
+    def _archive_output(self, programming_df, output_df, library_df):
+        """Keeps the schedule in the local archive. Failing to archive never fails the run."""
+        try:
+            schedule_archive.archive_schedule(self.config, programming_df, output_df, library_df, run_id=self.run_id)
+        except (sqlite3.Error, OSError, ValueError) as e:
+            self._error_event('archive_failed', exception=type(e).__name__, message=str(e))
+            print(f"Warning: Could not archive the {self.config['output_prefix']} schedule: {e}", file=sys.stderr)
+
+    def _assemble_output(self, programming_df, library_df):
+        """Maps the validated blocks to node IDs and builds the upload sheet."""
+        # Codes repeat across rows and columns, so each distinct one is mapped once; the
+        # columns are walked in the same order as row by row, so unmatched IDs are too
+        id_map = {}
+        def map_column(column):
+            for code in pd.unique(programming_df[column]):
+                if code not in id_map:
+                    id_map[code] = self._map_to_ids(code, library_df)
+            return programming_df[column].map(id_map)
+        mapped_ids = map_column('House Code')
+        mapped_bumpers_in = map_column('Bumper In')
+        mapped_bumpers_out = map_column('Bumper Out')
+
+        output_df = pd.DataFrame()
+        output_df['date'] = programming_df['Air Date']
+        output_df['linear_channel'] = self.config['linear_channel_id']
+        output_df['bumpers_in'] = mapped_bumpers_in.apply(lambda x: str(x).split('.')[0])
+        output_df['bumpers_in'] = output_df['bumpers_in'].str.replace('|ad_break', '', regex=False)
+        output_df['bumpers_out'] = mapped_bumpers_out.apply(lambda x: str(x).split('.')[0])
+        output_df['bumpers_out'] = output_df['bumpers_out'].str.replace('|ad_break', '', regex=False)
+        output_df['content'] = mapped_ids.astype(str).apply(lambda x: str(x).split('.')[0])
+        output_df['randomize_content'] = 'FALSE'
+        output_df['slot_duration'] = programming_df['Duration (minutes)']
+        output_df['time_slot'] = programming_df['Start Time']
+        promo_in = self.config.get('hourly_promo_in')
+        promo_out = self.config.get('hourly_promo_out')
+        if promo_in and promo_out:
+            self.log("Applying hourly promos...")
+            output_df['hour'] = output_df['time_slot'].str[:2]
+            output_df['is_new_hour'] = output_df['hour'] != output_df['hour'].shift()
+            output_df.loc[output_df['is_new_hour'], 'content'] = (promo_in + "|" + output_df.loc[output_df['is_new_hour'], 'content'].astype(str) + "|" + promo_out)
+            output_df = output_df.drop(columns=['hour', 'is_new_hour'])
+        output_df['content'] += '|ad_break'
+        final_columns = ['date', 'linear_channel', 'bumpers_in', 'bumpers_out', 'content', 'randomize_content', 'slot_duration', 'time_slot']
+        return output_df[final_columns].astype({column: 'category' for column in OUTPUT_CODE_COLUMNS})
+    
+    def _convert_seconds_to_hhmm(self, seconds):
+        if pd.isna(seconds): return "00:00"
+        total_minutes = int(seconds) // 60
+        return f"{total_minutes // 60:02}:{total_minutes % 60:02}"
+    
+    def _is_valid_duration(self, slot_duration, content_duration_seconds):
+        content_duration_hhmm = self._convert_seconds_to_hhmm(content_duration_seconds)
+        if slot_duration in VALID_DURATIONS:
+            start_time, end_time = VALID_DURATIONS[slot_duration]
+            return start_time <= content_duration_hhmm <= end_time
+        return False
+    
+    def _validate_slot_durations(self, programming_df, library_df):
+        unfit = []
+        merged = programming_df.merge(library_df[['legacy_id', 'duration']], left_on='House Code', right_on='legacy_id', how='left')
+        for _, row in merged.iterrows():
+            if pd.notna(row['duration']) and '|ad_break|' not in str(row['House Code']) and 'MEDIALIST' not in str(row['House Code']):
+                content_duration_hhmm = self._convert_seconds_to_hhmm(row['duration'])
+                slot_duration = row['Duration (minutes)']
+                if slot_duration in VALID_DURATIONS:
+                    start_time, end_time = VALID_DURATIONS[slot_duration]
+                    if not (start_time <= content_duration_hhmm <= end_time) and row['duration'] != 0:
+                        unfit.append({
+                            'House Code': row['House Code'], 
+                            'Slot Duration (minutes)': slot_duration, 
+                            'Content Duration (seconds)': int(row['duration']), 
+                            'Air Date': row['Air Date'], 
+                            'Start Time': row['Start Time'],
+                            'Valid Range': (start_time, end_time)
+                        })
+        return unfit
+    
+    def _build_airtime_index(self, programming_df):
+        """
+        Indexes the content airings of the new week together with the channel's archived
+        airings of the lookback window. Returns (index, new_airings, week_start).
+        """
+        new_airings, unplaced = [], []
+        for air_date, start_time, house_codes in programming_df[['Air Date', 'Start Time', 'House Code']].itertuples(index=False):
+            airtime = parse_airtime(air_date, start_time)
+            if airtime is None:
+                unplaced.append(f"{house_codes} on {air_date}")
+                continue
+            new_airings.extend((code, airtime) for code in str(house_codes).split('|ad_break|') if code and not code.startswith('MEDIALIST'))
+        if unplaced:
+            self.log(f"\nWARNING: {len(unplaced)} blocks have no readable start time and are left out of the repeat check:\n" + "\n".join(f"  > {block}" for block in unplaced))
+        if not new_airings:
+            return schedule_archive.AirtimeIndex(), [], None
+        first_airtime = min(airtime for _, airtime in new_airings)
+        week_start = (first_airtime - timedelta(days=first_airtime.weekday())).replace(hour=0, minute=0)
+        since = week_start - timedelta(weeks=REPEAT_LOOKBACK_WEEKS)
+
+        index = schedule_archive.AirtimeIndex()
+        if schedule_archive.ARCHIVE_PATH and REPEAT_LOOKBACK_WEEKS:
+            try:
+                index = schedule_archive.load_airtime_index(self.config['output_prefix'], since.strftime("%Y-%m-%d"), week_start.strftime("%Y-%m-%d"))
+            except sqlite3.Error as e:
+                print(f"Warning: Could not read the archive for the repeat check: {e}", file=sys.stderr)
+        for code, airtime in new_airings:
+            index.add(code, airtime)
+        return index, new_airings, week_start
+
+    def _check_content_repeats(self, programming_df):
+        """
+        Flags house codes that air more than the channel's limit across the new week and
+        the archived weeks before it, and airings of the new week that follow the code's
+        previous airing by less than the minimum gap.
+        """
+        max_airings = self.config.get('repeat_max_airings', REPEAT_MAX_AIRINGS)
+        min_gap_hours = self.config.get('repeat_min_gap_hours', REPEAT_MIN_GAP_HOURS)
+        if programming_df.empty or not (max_airings or min_gap_hours):
+            return []
+
+        index, new_airings, week_start = self._build_airtime_index(programming_df)
+        self.airtime_index = index
+        repeats = []
+        for code in sorted({code for code, _ in new_airings}):
+            airtimes = index.airings(code)
+            if max_airings and len(airtimes) > max_airings:
+                repeats.append({'House Code': code, 'Kind': 'max_airings', 'Airings': len(airtimes), 'Limit': max_airings, 'Since': airtimes[0].strftime("%m/%d/%Y")})
+            if min_gap_hours:
+                for previous, airtime in index.close_repeats(code, timedelta(hours=min_gap_hours), since=week_start):
+                    repeats.append({
+                        'House Code': code, 'Kind': 'min_gap', 'Limit': min_gap_hours,
+                        'Air Date': airtime.strftime("%m/%d/%Y"), 'Start Time': airtime.strftime("%H:%M"),
+                        'Previous Airing': previous.strftime("%m/%d/%Y %H:%M"),
+                        'Gap (hours)': round((airtime - previous).total_seconds() / 3600, 2)
+                    })
+        return repeats
+
+    def _suggest_fills(self, programming_df, library_df, unfit_durations):
+        """Proposes fills for mismatched fill slots and empty time (see schedule_autofill.py)."""
+        if programming_df.empty or library_df.empty or 'duration' not in library_df.columns:
+            return []
+        airtime_index = self.airtime_index if self.airtime_index is not None else self._build_airtime_index(programming_df)[0]
+        return schedule_autofill.solve_week(self.config, programming_df, library_df, unfit_durations, airtime_index)
+
+    def _report_only(self, name, check, *args):
+        """
+        Runs a check that only warns. An error in it is logged and the run goes on
+        without its findings, so the sheet is never lost to a warning.
+        """
+        try:
+            return check(*args)
+        except Exception as e:
+            self._error_event(f'{name}_failed', exception=type(e).__name__, message=str(e))
+            self.log(f"\nWARNING: The {name.replace('_', ' ')} failed and was skipped: {e}")
+            return []
+
+    def _check_zero_duration_content(self, programming_df, library_df):
+        zero = []
+        merged = programming_df.merge(library_df[['legacy_id', 'id', 'duration']], left_on='House Code', right_on='legacy_id', how='left')
+        zero_duration_content = merged[merged['duration'] == 0]
+        for _, row in zero_duration_content.iterrows():
+            zero.append({'House Code': row['House Code'], 'Mapped IDs': str(row['id']).split('.')[0]})
+        return zero
+
+def run_batch(channel_names, week_starts, library_file_content, max_workers=BATCH_MAX_WORKERS, on_result=None, engine_factory=ProcessingEngine):
+    """
+    Runs every (channel, week) pair in parallel on one thread pool. All runs share the
+    HTTP session, the parsed library index and a download-once grid cache. Returns a list
+    of result dicts in (week, channel) order; on_result is called as each run finishes.
+    engine_factory builds the engine for each run and takes ProcessingEngine's arguments.
+    """
+    load_library(library_file_content)  # Parse once up front so the workers only hit the cache
+    grid_cache = GridCache()
+
+    def run_one(channel_name, week_start):
+        engine = engine_factory(CHANNEL_CONFIG[channel_name], week_start, library_file_content, grid_cache=grid_cache)
+        started = time.perf_counter()
+        df = engine.run()
+        result = {
+            'channel': channel_name,
+            'week_start': week_start,
+            'engine': engine,
+            'df': df,
+            'elapsed_seconds': time.perf_counter() - started
+        }
+        if on_result:
+            on_result(result)
+        return result
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(run_one, channel_name, week_start) for week_start in week_starts for channel_name in channel_names]
+        return [future.result() for future in futures]
+
+# Upload sheet columns that repeat a few values down the rows; they are categorical in the
+# engine's output and share one sorted dictionary per column in the combined sheet
+OUTPUT_CODE_COLUMNS = ['date', 'linear_channel', 'bumpers_in', 'bumpers_out', 'content', 'randomize_content', 'time_slot']
+SORT_COLUMNS = ['linear_channel', 'date', 'time_slot']
+MERGE_CHUNK_ROWS = int(os.environ.get("MERGE_CHUNK_ROWS", "2048"))
+
+def _sort_key(series):
+    """
+    The values a sort column is ordered by: its own values, so channel IDs compare as
+    numbers, except MM/DD/YYYY dates, which become YYYY-MM-DD so a range crossing a year
+    stays in order, with unreadable dates after the readable ones. Missing values stay missing.
+    """
+    values = series.astype(object)
+    if series.name != 'date':
+        return values
+    missing = values.isna()
+    days = pd.to_datetime(values.where(~missing, None), format="%m/%d/%Y", errors="coerce")
+    keys = days.dt.strftime("%Y-%m-%d").astype(object)
+    return keys.where(days.notna(), "~" + values.astype(str)).where(~missing, None)
+
+@total_ordering
+class _MissingLast:
+    """Compares after every value, as sort_values places missing values."""
+    def __eq__(self, other):
+        return isinstance(other, _MissingLast)
+
+    def __lt__(self, other):
+        return False
+
+    def __hash__(self):
+        return 0
+
+MISSING_LAST = _MissingLast()
+
+def combine_schedules(dataframes):
+    """
+    Combines per-channel schedules into one sheet sorted by channel, date and time slot.
+    The code columns are unioned onto sorted dictionaries. Rows with equal keys keep the
+    order of their sheets.
+    """
+    columns = {}
+    for column in dataframes[0].columns:
+        if column in OUTPUT_CODE_COLUMNS:
+            columns[column] = union_categoricals([df[column].astype('category') for df in dataframes], sort_categories=True)
+        else:
+            columns[column] = pd.concat([df[column] for df in dataframes], ignore_index=True)
+    master_df = pd.DataFrame(columns)
+    master_df.sort_values(by=SORT_COLUMNS, key=_sort_key, kind='stable', inplace=True)
+    return master_df
+
+def _column_values(series):
+    """The column as a numpy array to take rows from, with missing values as ''."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        # Missing values have code -1, which takes the '' after the last category
+        categories = np.append(series.cat.categories.to_numpy(dtype=object), '')
+        codes = series.cat.codes.to_numpy()
+        return lambda rows: categories[codes[rows]]
+    values = series.to_numpy()
+    if values.dtype != object:
+        return lambda rows: values[rows]
+    return lambda rows: np.where(pd.isna(values[rows]), '', values[rows])
+
+def _sorted_rows(df):
+    """
+    One sheet's (sort key, row) pairs in SORT_COLUMNS order, MERGE_CHUNK_ROWS at a time.
+    The order is the stable one combine_schedules gives, so rows already in order stay put.
+    """
+    keys, sort_codes = [], []
+    for column in SORT_COLUMNS:
+        key = _sort_key(df[column]).to_numpy(dtype=object, copy=True)
+        missing = pd.isna(key)
+        codes = np.zeros(len(key), dtype=np.int64)
+        codes[~missing], uniques = pd.factorize(key[~missing], sort=True)
+        codes[missing] = len(uniques)  # Missing values last, as in sort_values
+        key[missing] = MISSING_LAST
+        keys.append(key)
+        sort_codes.append(codes)
+    order = np.lexsort(sort_codes[::-1])
+    columns = [_column_values(df[column]) for column in df.columns]
+    for first in range(0, len(order), MERGE_CHUNK_ROWS):
+        rows = order[first:first + MERGE_CHUNK_ROWS]
+        yield from zip(zip(*(key[rows].tolist() for key in keys)), zip(*(column(rows).tolist() for column in columns)))
+
+def merge_schedules(dataframes):
+    """
+    The rows of per-channel schedules in the order combine_schedules sorts them, without
+    building the combined sheet: a k-way merge of each sheet's sorted rows, holding one
+    chunk per sheet. Rows with equal keys keep the order of their sheets.
+    """
+    columns = list(dataframes[0].columns)
+    merged = heapq.merge(*(_sorted_rows(df[columns]) for df in dataframes), key=itemgetter(0))
+    return (row for _, row in merged)
+
+def write_combined_schedule(dataframes, file):
+    """Writes the combined schedule sheet as CSV to an open text file or buffer as it is merged."""
+    writer = csv.writer(file, lineterminator='\n')
+    writer.writerow(dataframes[0].columns)
+    writer.writerows(merge_schedules(dataframes))
@@ -0,0 +1,120 @@
+import os
+import sys
+import json
+import argparse
+import statistics
+import uuid
+import logging
+import threading
+import contextvars
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+
+# Structured event stream of every processing run, written as JSON lines to a rotating
+# local file: run start and end, stage timings, validation findings with codes, cache
+# lookups and errors. Engine.logs stays the human-readable log posted to Slack; this is
+# the one to aggregate. Set SCHEDULE_EVENT_LOG="" to turn it off.
+#
+# Every event carries the fields of the run it happened in (run_id, channel, input_date,
+# mode), so events from concurrent runs in one process can be told apart.
+
+EVENT_LOG = os.environ.get("SCHEDULE_EVENT_LOG", os.path.join(os.path.dirname(os.path.abspath(__file__)), "logs", "events.jsonl"))
+EVENT_LOG_MAX_BYTES = int(os.environ.get("SCHEDULE_EVENT_LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+EVENT_LOG_BACKUPS = int(os.environ.get("SCHEDULE_EVENT_LOG_BACKUPS", "5"))
+
+# Fields of the run the current thread is working on; worker threads start empty.
+_run_fields = contextvars.ContextVar("schedule_run_fields", default={})
+
+_logger = logging.getLogger("schedule.events")
+_logger.setLevel(logging.INFO)
+_logger.propagate = False
+_handler_path = None
+_handler_lock = threading.Lock()
+
+def _json_default(value):
+    return value.item() if hasattr(value, 'item') else str(value)  # numpy scalars from the grid
+
+class _JsonLineFormatter(logging.Formatter):
+    def format(self, record):
+        return json.dumps(record.msg, default=_json_default, ensure_ascii=False)
+
+def _ensure_handler():
+    """(Re)opens the rotating file when EVENT_LOG is first used or has been changed."""
+    global _handler_path
+    with _handler_lock:
+        if _handler_path == EVENT_LOG:
+            return bool(_logger.handlers)
+        for handler in list(_logger.handlers):
+            _logger.removeHandler(handler)
+            handler.close()
+        _handler_path = EVENT_LOG
+        if not EVENT_LOG:
+            return False
+        try:
+            os.makedirs(os.path.dirname(EVENT_LOG) or '.', exist_ok=True)
+            handler = RotatingFileHandler(EVENT_LOG, maxBytes=EVENT_LOG_MAX_BYTES, backupCount=EVENT_LOG_BACKUPS, encoding='utf-8', delay=True)
+        except OSError as e:
+            print(f"Warning: Could not open the event log {EVENT_LOG}: {e}", file=sys.stderr)
+            return False
+        handler.setFormatter(_JsonLineFormatter())
+        _logger.addHandler(handler)
+        return True
+
+def emit_event(event, **fields):
+    """Writes one event with the current run's fields. Failing to write never fails the run."""
+    if not EVENT_LOG or not _ensure_handler():
+        return
+    _logger.info({'time': datetime.now().isoformat(timespec='milliseconds'), 'event': event, **_run_fields.get(), **fields})
+
+def new_run_id():
+    return uuid.uuid4().hex[:12]
+
+def begin_run(**fields):
+    """Tags this thread's events with the run's fields; pass the token to end_run."""
+    return _run_fields.set({**_run_fields.get(), **fields})
+
+def end_run(token):
+    _run_fields.reset(token)
+
+def read_events(path=None):
+    """Yields the events of a log file and its rotated backups, oldest first."""
+    path = path or EVENT_LOG
+    for backup in range(EVENT_LOG_BACKUPS, -1, -1):
+        file_path = f"{path}.{backup}" if backup else path
+        if not os.path.exists(file_path):
+            continue
+        with open(file_path, encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+def summarize(events):
+    """Per channel and mode: runs, outcomes, wall time percentiles and the most common finding and error codes."""
+    summary = {}
+    for event in events:
+        if event['event'] not in ('run_end', 'finding', 'error'):
+            continue
+        entry = summary.setdefault(f"{event.get('channel')} {event.get('mode')}", {'runs': 0, 'outcomes': {}, 'wall_seconds': [], 'findings': {}, 'errors': {}})
+        if event['event'] == 'run_end':
+            entry['runs'] += 1
+            entry['outcomes'][event['outcome']] = entry['outcomes'].get(event['outcome'], 0) + 1
+            entry['wall_seconds'].append(event['wall_seconds'])
+        else:
+            counts = entry['findings' if event['event'] == 'finding' else 'errors']
+            counts[event['code']] = counts.get(event['code'], 0) + 1
+    for entry in summary.values():
+        wall = sorted(entry.pop('wall_seconds'))
+        entry['p50_seconds'] = round(statistics.median(wall), 3) if wall else None
+        entry['p95_seconds'] = round(wall[min(len(wall) - 1, int(round(0.95 * (len(wall) - 1))))], 3) if wall else None
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize the run event log by channel.")
+    parser.add_argument("path", nargs="?", default=EVENT_LOG, help="Event log (default: SCHEDULE_EVENT_LOG).")
+    parser.add_argument("--since", help="Only events at or after this ISO time, e.g. 2026-03-01.")
+    args = parser.parse_args()
+    events = (event for event in read_events(args.path) if not args.since or event['time'] >= args.since)
+    print(json.dumps(summarize(events), indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+import os
+import io
+import csv
+import sys
+import zlib
+import random
+import argparse
+from datetime import timedelta
+from schedule_engine import CHANNEL_CONFIG, parse_input_date
+from schedule_codes import split_alternatives
+
+# Synthetic inputs for benchmarks and offline runs: gviz-style week grids shaped like the
+# real channel sheets, and OTTera library exports covering every code the grids use.
+# Everything is seeded, so the same arguments always produce the same bytes.
+
+DAY_NAMES = ["MONDAY", "TUESDAY", "WEDNESDAY", "THURSDAY", "FRIDAY", "SATURDAY", "SUNDAY"]
+SLOTS_PER_DAY = 48
+CATALOG_SIZE = 120
+BUMPER_COUNT = 8
+BLOCK_LENGTHS = [1, 1, 2, 2, 2, 3, 4, 4, 6]  # In 30 minute slots
+DUPLICATE_RATIO = 0.15
+
+def seed_for(*parts):
+    """Stable seed for a set of names; hash() is randomized per process."""
+    return zlib.crc32("|".join(str(part) for part in parts).encode())
+
+def code_prefixes(pattern):
+    """The prefixes of the plain PREFIX\\d+ alternatives of a channel's house code or bumper pattern."""
+    return [prefix for prefix, suffix in split_alternatives(pattern) if suffix == r'\d+'] if pattern else []
+
+def channel_catalog(config, size=CATALOG_SIZE):
+    """The house codes and bumpers a channel's synthetic grids draw from."""
+    prefixes = code_prefixes(config['house_code_pattern'])
+    bumper_prefixes = code_prefixes(config.get('bumper_pattern'))
+    house_codes = [f"{prefixes[i % len(prefixes)]}{100 + i}" for i in range(size)]
+    bumpers = [f"{bumper_prefixes[i % len(bumper_prefixes)]}{i + 1}" for i in range(BUMPER_COUNT)] if bumper_prefixes else []
+    return house_codes, bumpers
+
+def _standard_cell(rng, house_codes, bumpers):
+    roll = rng.random()
+    code = rng.choice(house_codes)
+    if roll < 0.06:
+        return f"MEDIA LIST: {rng.randint(100, 999)}"
+    if roll < 0.09:
+        return f"QT MEDIA LIST {rng.randint(100, 999)}"
+    if roll < 0.12:
+        return f"{code}, {rng.choice(house_codes)}"
+    if roll < 0.30 and bumpers:
+        return f"{rng.choice(bumpers)} {code} {rng.choice(bumpers)}"
+    if roll < 0.40:
+        return f"{code} - Encore"
+    return code
+
+def _pll_domestic_cell(rng, house_codes, bumpers):
+    roll = rng.random()
+    code = rng.choice(house_codes)
+    if roll < 0.05:
+        return f"QT MEDIA LIST {rng.randint(100, 999)}"
+    if roll < 0.12:
+        return f"BROKEN GLASS: {code}"
+    if roll < 0.16:
+        return f"BG {code}"
+    if roll < 0.22:
+        return f"{code}\n{rng.choice(house_codes)}"
+    if roll < 0.45 and bumpers:
+        return f"{rng.choice(bumpers)}, {code}, {rng.choice(bumpers)}"
+    if roll < 0.55 and bumpers:
+        return f"{code}, {rng.choice(bumpers)}"
+    return code
+
+def _slvr_cell(rng, house_codes, bumpers):
+    roll = rng.random()
+    code = rng.choice(house_codes)
+    if roll < 0.08:
+        return f"SOCAL MEDIA LIST {rng.randint(100, 999)} / BROKEN GLASS: {code}"
+    if roll < 0.12:
+        return f"SOCAL ML {rng.randint(100, 999)} / BROKEN GLASS {code}"
+    if roll < 0.18:
+        return f"MEDIA LIST: {rng.randint(100, 999)}"
+    if roll < 0.35 and bumpers:
+        return f"{rng.choice(bumpers)}, {code}, {rng.choice(bumpers)}"
+    return code
+
+CELL_GENERATORS = {
+    'standard': _standard_cell,
+    'pll domestic': _pll_domestic_cell,
+    'slvr': _slvr_cell,
+    'slvr socal': _slvr_cell
+}
+
+def slot_times():
+    return [f"{(hour % 12) or 12}:{minute:02d} {'AM' if hour < 12 else 'PM'}" for hour in range(24) for minute in (0, 30)]
+
+def make_grid(config, week_start, seed=None):
+    """
+    Builds one week tab as the gviz CSV export returns it: a day-name header, a date row
+    and a blank row, 48 half-hour slots, a notes column and a few footer rows. Blocks
+    span one or more slots, with the cells after the first left empty.
+    """
+    week_start_date = parse_input_date(week_start)
+    rng = random.Random(seed_for(config['output_prefix'], week_start) if seed is None else seed)
+    house_codes, bumpers = channel_catalog(config)
+    make_cell = CELL_GENERATORS.get(config.get('processing_logic'), _standard_cell)
+
+    days = []
+    for _ in range(7):
+        cells = []
+        while len(cells) < SLOTS_PER_DAY:
+            cells.append(make_cell(rng, house_codes, bumpers))
+            cells.extend([''] * (rng.choice(BLOCK_LENGTHS) - 1))
+        days.append(cells[:SLOTS_PER_DAY])
+
+    rows = [[''] + DAY_NAMES + ['NOTES']]
+    rows.append([''] + [f"{day.month}/{day.day}" for day in (week_start_date + timedelta(days=i) for i in range(7))] + [''])
+    rows.append([''] * 9)
+    for slot, start_time in enumerate(slot_times()):
+        rows.append([start_time] + [days[day][slot] for day in range(7)] + [''])
+    rows.append(['TOTALS'] + [''] * 8)
+    rows.append(['Last updated by scheduling'] + [''] * 8)
+
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue().encode()
+
+def make_library(rows, configs=None, duplicate_ratio=DUPLICATE_RATIO, seed=0):
+    """
+    Builds an OTTera library export with at least `rows` rows. Every code in the given
+    channels' catalogs is present, the rest is archive filler, and about duplicate_ratio
+    of the rows are older versions of a legacy_id with a lower node id.
+    """
+    rng = random.Random(seed)
+    configs = list(CHANNEL_CONFIG.values()) if configs is None else configs
+    legacy_ids = []
+    for config in configs:
+        house_codes, bumpers = channel_catalog(config)
+        legacy_ids.extend((code, 'episode') for code in house_codes)
+        legacy_ids.extend((code, 'bumper') for code in bumpers)
+    legacy_ids = list(dict.fromkeys(legacy_ids))
+
+    unique_rows = max(len(legacy_ids), int(rows * (1 - duplicate_ratio)))
+    legacy_ids.extend((f"ARCHIVE{n}", 'episode') for n in range(unique_rows - len(legacy_ids)))
+
+    library_rows = []
+    next_id = 100000
+    for legacy_id, kind in legacy_ids:
+        duration = rng.randint(15, 60) if kind == 'bumper' else rng.choice([rng.randint(1200, 1500), rng.randint(2700, 3300), rng.randint(5400, 6600)])
+        library_rows.append([next_id, legacy_id, f"{legacy_id} {kind.title()}", duration, f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"])
+        next_id += 1
+    for _ in range(max(0, rows - len(library_rows))):
+        legacy_id, kind = rng.choice(legacy_ids)
+        library_rows.append([rng.randint(1000, 99999), legacy_id, f"{legacy_id} {kind.title()} (old)", rng.randint(15, 6600), "2024-01-01"])
+    rng.shuffle(library_rows)
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(['id', 'legacy_id', 'title', 'duration', 'created'])
+    writer.writerows(library_rows)
+    return buffer.getvalue()
+
+def main():
+    parser = argparse.ArgumentParser(description="Write synthetic week grids and an OTTera library export to a directory.")
+    parser.add_argument("output_dir")
+    parser.add_argument("start_date", help="Any date in the week to generate, e.g. 03/02/2026.")
+    parser.add_argument("channels", nargs="*", default=list(CHANNEL_CONFIG.keys()), metavar="CHANNEL")
+    parser.add_argument("--library-rows", type=int, default=1000)
+    args = parser.parse_args()
+
+    start_date = parse_input_date(args.start_date)
+    if start_date is None:
+        print(f"Error: Invalid date format: {args.start_date}.", file=sys.stderr)
+        sys.exit(2)
+    week_start = (start_date - timedelta(days=start_date.weekday())).strftime("%Y-%m-%d")
+    configs = [CHANNEL_CONFIG[name] for name in args.channels]
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    for config in configs:
+        path = os.path.join(args.output_dir, f"{config['output_prefix']}_Grid_{week_start}.csv")
+        with open(path, 'wb') as f:
+            f.write(make_grid(config, week_start))
+        print(path)
+    path = os.path.join(args.output_dir, f"Library_{args.library_rows}.csv")
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(make_library(args.library_rows, configs))
+    print(path)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+import os
+import io
+import sys
+import json
+import math
+import time
+import argparse
+import warnings
+import tracemalloc
+import contextlib
+from datetime import datetime
+import pandas as pd
+import schedule_engine
+import schedule_events
+import schedule_archive
+from schedule_engine import CHANNEL_CONFIG, ProcessingEngine
+from schedule_fixtures import make_grid, make_library
+from schedule_bench import clear_library_cache, load_engine_class
+
+# Golden-output replay: every engine variant is run against recorded week grids and
+# library snapshots, and must reproduce the recorded CSV byte for byte (or halt with the
+# recorded error) within each case's time and memory budget. Swap in a faster parser,
+# run `python schedule_golden.py`, and any change in output shows up as a failure.
+#
+# `python schedule_golden.py record` re-records the cases with the current engine; only
+# do that when an output change is intended. The committed grids come from the seeded
+# generator in schedule_fixtures.py; --from-sheets records the live Google Sheets tabs.
+
+GOLDEN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "golden")
+MANIFEST_PATH = os.path.join(GOLDEN_DIR, "manifest.json")
+GOLDEN_DATE = "03/04/2026"
+GOLDEN_LIBRARY_ROWS = 1000
+# Budgets are recorded as a multiple of the measured run, with a floor for slow machines
+TIME_BUDGET_FACTOR, MIN_TIME_BUDGET_SECONDS = 5, 2.0
+MEMORY_BUDGET_FACTOR, MIN_MEMORY_BUDGET_MIB = 2, 16
+# Codes left out of the partial library, so its case must halt on unmatched house codes
+PARTIAL_LIBRARY_DROPPED = [f"BARK{n}" for n in range(100, 140, 2)]
+# A time label grid prep can't read leaves those blocks without a Start Time; the sheet must
+# still come out, with blank time slots. Recorded on the next week so the tab is its own.
+BLANK_TIME_DATE = "03/11/2026"
+BLANK_TIME_LABEL = (b"\n1:00 AM,", b"\n1:00 AM ET,")
+
+def make_fixture_engine_class(engine_class, grids):
+    class FixtureEngine(engine_class):
+        """Serves week tabs from the recorded grids instead of Google Sheets."""
+        def _download_sheet(self, spreadsheet_id, sheet_name):
+            grid_content = grids.get((spreadsheet_id, sheet_name))
+            if grid_content is None:
+                self.log(f"ERROR: Could not get grid for '{sheet_name}'.")
+                self.log("Status code: 404. No recorded fixture for this tab.")
+            return grid_content
+    return FixtureEngine
+
+def _new_engine(engine_class, case, grids, library_content, incremental):
+    return make_fixture_engine_class(engine_class, grids)(CHANNEL_CONFIG[case['channel']], case['date'], library_content, incremental=incremental)
+
+def run_full(engine_class, case, grids, library_content):
+    return _new_engine(engine_class, case, grids, library_content, False)
+
+def run_incremental(engine_class, case, grids, library_content):
+    """Primes the incremental cache with one run, so the measured run re-uses every day."""
+    with schedule_engine._grid_cache_lock:
+        schedule_engine._grid_cache.clear()
+    _new_engine(engine_class, case, grids, library_content, True).run()
+    return _new_engine(engine_class, case, grids, library_content, True)
+
+# Ways of running an engine class; each must give the recorded output
+ENGINE_VARIANTS = {
+    'full': run_full,
+    'incremental': run_incremental
+}
+
+def read_bytes(path):
+    with open(os.path.join(GOLDEN_DIR, path), 'rb') as f:
+        return f.read()
+
+def replay_case(engine_class, variant, case, grids, library_content):
+    """Runs one case once for time and once under tracemalloc for memory."""
+    with contextlib.redirect_stderr(io.StringIO()):  # The 9th-column truncation warning
+        clear_library_cache()
+        engine = ENGINE_VARIANTS[variant](engine_class, case, grids, library_content)
+        started = time.perf_counter()
+        final_df = engine.run()
+        elapsed = time.perf_counter() - started
+
+        clear_library_cache()
+        memory_engine = ENGINE_VARIANTS[variant](engine_class, case, grids, library_content)
+        tracemalloc.start()
+        memory_engine.run()
+        _, peak_bytes = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    output = None if final_df is None else final_df.to_csv(index=False).encode()
+    return final_df, output, engine.logs, elapsed, peak_bytes / (1024 * 1024)
+
+def check_case(engine_class, variant, case, grids, library_cache):
+    if case['library'] not in library_cache:
+        library_cache[case['library']] = read_bytes(case['library']).decode('utf-8')
+    final_df, output, logs, elapsed, peak_mib = replay_case(engine_class, variant, case, grids, library_cache[case['library']])
+
+    failures = []
+    if case['expected'] is None:
+        if output is not None:
+            failures.append("expected the run to halt, but it produced a sheet")
+        if case.get('expected_log') and not any(case['expected_log'] in line for line in logs):
+            failures.append(f"expected '{case['expected_log']}' in the log")
+    elif output is None:
+        failures.append("the run halted: " + " / ".join(line.strip() for line in logs if 'ERROR' in line)[:300])
+    else:
+        expected = read_bytes(case['expected'])
+        if output != expected:
+            expected_lines, output_lines = expected.decode().splitlines(), output.decode().splitlines()
+            first_diff = next((i for i, (a, b) in enumerate(zip(expected_lines, output_lines)) if a != b), min(len(expected_lines), len(output_lines)))
+            failures.append(f"output differs from {case['expected']} at line {first_diff + 1} "
+                            f"({len(output_lines)} lines vs {len(expected_lines)} expected)")
+    if elapsed > case['max_seconds']:
+        failures.append(f"took {elapsed:.2f}s, budget {case['max_seconds']}s")
+    if peak_mib > case['max_peak_mib']:
+        failures.append(f"peaked at {peak_mib:.1f} MiB, budget {case['max_peak_mib']} MiB")
+    return failures, elapsed, peak_mib, final_df
+
+def check_combined(sheets):
+    """
+    The streamed combined sheet of every replayed sheet must match a plain concat and
+    stable sort of them; the recorded weeks share a year, so their dates sort as text.
+    """
+    streamed = io.StringIO()
+    schedule_engine.write_combined_schedule(sheets, streamed)
+    expected = pd.concat(sheets, ignore_index=True).sort_values(schedule_engine.SORT_COLUMNS, kind='stable').to_csv(index=False, lineterminator='\n')
+    if streamed.getvalue() == expected:
+        return None
+    expected_lines, output_lines = expected.splitlines(), streamed.getvalue().splitlines()
+    first_diff = next((i for i, (a, b) in enumerate(zip(expected_lines, output_lines)) if a != b), min(len(expected_lines), len(output_lines)))
+    return f"the merged sheet differs from the concat sort at line {first_diff + 1}"
+
+def load_manifest():
+    with open(MANIFEST_PATH, encoding='utf-8') as f:
+        manifest = json.load(f)
+    grids = {(CHANNEL_CONFIG[case['channel']]['spreadsheet_id'], case['tab']): read_bytes(case['grid']) for case in manifest['cases']}
+    return manifest, grids
+
+def check(engine_specs, variants):
+    manifest, grids = load_manifest()
+    library_cache = {}
+    failed = 0
+    for spec in engine_specs:
+        engine_class = load_engine_class(spec)
+        for variant in variants:
+            print(f"\n--- {spec} | {variant} ---", file=sys.stderr)
+            sheets = []
+            for case in manifest['cases']:
+                failures, elapsed, peak_mib, final_df = check_case(engine_class, variant, case, grids, library_cache)
+                status = "FAIL" if failures else "ok"
+                print(f"  {status:<4} {case['name']:<22} {elapsed:6.3f}s {peak_mib:7.1f} MiB", file=sys.stderr)
+                for failure in failures:
+                    print(f"         {failure}", file=sys.stderr)
+                failed += bool(failures)
+                if final_df is not None:
+                    sheets.append(final_df)
+            failure = check_combined(sheets)
+            print(f"  {'FAIL' if failure else 'ok':<4} combined sheet", file=sys.stderr)
+            if failure:
+                print(f"         {failure}", file=sys.stderr)
+                failed += 1
+    total = len(engine_specs) * len(variants) * (len(manifest['cases']) + 1)
+    print(f"\n{total - failed} of {total} replays matched the golden output.", file=sys.stderr)
+    return failed == 0
+
+def record(from_sheets, library_path):
+    """Writes grids, libraries, expected outputs and budgets for every channel from the current engine."""
+    for sub_dir in ("grids", "libraries", "expected"):
+        os.makedirs(os.path.join(GOLDEN_DIR, sub_dir), exist_ok=True)
+
+    if library_path:
+        with open(library_path, encoding='utf-8') as f:
+            library_content = f.read()
+    else:
+        library_content = make_library(GOLDEN_LIBRARY_ROWS)
+    partial_library = "\n".join(line for line in library_content.split("\n") if not any(f",{code}," in line for code in PARTIAL_LIBRARY_DROPPED))
+    libraries = {"libraries/library.csv": library_content, "libraries/library_partial.csv": partial_library}
+    for path, content in libraries.items():
+        with open(os.path.join(GOLDEN_DIR, path), 'w', encoding='utf-8', newline='') as f:
+            f.write(content)
+
+    cases = [{'name': channel_name, 'channel': channel_name, 'library': "libraries/library.csv"} for channel_name in CHANNEL_CONFIG]
+    cases.append({'name': "Bark unmatched codes", 'channel': "Bark", 'library': "libraries/library_partial.csv", 'expected_log': "UNMATCHED HOUSE CODES"})
+    cases.append({'name': "Bark blank time label", 'channel': "Bark", 'library': "libraries/library.csv", 'date': BLANK_TIME_DATE, 'suffix': "_blank_time"})
+
+    grids = {}
+    for case in cases:
+        config = CHANNEL_CONFIG[case['channel']]
+        case.setdefault('date', GOLDEN_DATE)
+        engine = ProcessingEngine(config, case['date'], library_content, incremental=False)
+        week_name, week_start = engine._get_week_name_of_input_date(case['date'])
+        case.update({'tab': week_name.upper(), 'grid': f"grids/{config['output_prefix']}_{week_start.strftime('%Y-%m-%d')}{case.get('suffix', '')}.csv"})
+        key = (config['spreadsheet_id'], case['tab'])
+        if key not in grids:
+            grids[key] = engine._download_sheet(*key) if from_sheets else make_grid(config, week_start.strftime('%Y-%m-%d'))
+            if grids[key] is None:
+                raise RuntimeError("\n".join(engine.logs))
+            if case['date'] == BLANK_TIME_DATE:
+                if BLANK_TIME_LABEL[0] not in grids[key]:
+                    raise RuntimeError(f"{case['name']}: the grid has no {BLANK_TIME_LABEL[0].strip().decode()!r} row to relabel.")
+                grids[key] = grids[key].replace(*BLANK_TIME_LABEL)
+        with open(os.path.join(GOLDEN_DIR, case['grid']), 'wb') as f:
+            f.write(grids[key])
+
+    for case in cases:
+        _, output, logs, elapsed, peak_mib = replay_case(ProcessingEngine, 'full', case, grids, libraries[case['library']])
+        if 'expected_log' in case:
+            case['expected'] = None
+            if output is not None or not any(case['expected_log'] in line for line in logs):
+                raise RuntimeError(f"{case['name']} was expected to halt with '{case['expected_log']}'.")
+        elif output is None:
+            raise RuntimeError(f"{case['name']} halted while recording:\n" + "\n".join(logs))
+        else:
+            case['expected'] = f"expected/{CHANNEL_CONFIG[case['channel']]['output_prefix']}{case.get('suffix', '')}.csv"
+            with open(os.path.join(GOLDEN_DIR, case['expected']), 'wb') as f:
+                f.write(output)
+        case['max_seconds'] = max(MIN_TIME_BUDGET_SECONDS, round(elapsed * TIME_BUDGET_FACTOR, 1))
+        case['max_peak_mib'] = max(MIN_MEMORY_BUDGET_MIB, math.ceil(peak_mib * MEMORY_BUDGET_FACTOR))
+        print(f"Recorded {case['name']}: {elapsed:.3f}s, {peak_mib:.1f} MiB", file=sys.stderr)
+
+    manifest = {
+        'recorded': datetime.now().isoformat(timespec='seconds'),
+        'source': "google sheets" if from_sheets else "schedule_fixtures",
+        'cases': [{key: case[key] for key in ('name', 'channel', 'date', 'tab', 'grid', 'library', 'expected', 'expected_log', 'max_seconds', 'max_peak_mib') if key in case} for case in cases]
+    }
+    with open(MANIFEST_PATH, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+        f.write("\n")
+    print(f"Manifest saved to {MANIFEST_PATH}!", file=sys.stderr)
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded grids through every engine variant and compare with the golden output.")
+    subparsers = parser.add_subparsers(dest="command")
+    check_parser = subparsers.add_parser("check", help="Replay the golden cases (default).")
+    check_parser.add_argument("--engine", action="append", help="Engine class as module:ClassName; repeatable (default: schedule_engine:ProcessingEngine).")
+    check_parser.add_argument("--variant", action="append", choices=list(ENGINE_VARIANTS), help="Only run these variants.")
+    record_parser = subparsers.add_parser("record", help="Re-record the golden cases with the current engine.")
+    record_parser.add_argument("--from-sheets", action="store_true", help="Record the live Google Sheets tabs instead of generated grids.")
+    record_parser.add_argument("--library", help="Library export to record against (default: a generated one).")
+    args = parser.parse_args()
+
+    warnings.simplefilter('ignore', UserWarning)  # Date parsing warnings from the grid prep
+    schedule_events.EVENT_LOG = ""  # Keep replays out of the event log and the archive
+    schedule_archive.ARCHIVE_PATH = ""
+    if args.command == "record":
+        record(args.from_sheets, args.library)
+        return
+    engine_specs = getattr(args, 'engine', None) or ["schedule_engine:ProcessingEngine"]
+    variants = getattr(args, 'variant', None) or list(ENGINE_VARIANTS)
+    sys.exit(0 if check(engine_specs, variants) else 1)
+
+if __name__ == "__main__":
+    main()
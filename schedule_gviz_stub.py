@@ -0,0 +1,256 @@
+import os
+import sys
+import json
+import time
+import random
+import hashlib
+import argparse
+import statistics
+import threading
+import warnings
+from datetime import datetime, timedelta
+from urllib.parse import urlparse, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import schedule_engine
+import schedule_events
+import schedule_archive
+from schedule_engine import CHANNEL_CONFIG, get_week_starts, load_library, run_batch
+from schedule_fixtures import make_grid, make_library
+from schedule_metrics import CACHE_REQUESTS
+
+# Local stand-in for the Google Sheets gviz CSV export. It answers
+#   /spreadsheets/d/{spreadsheet_id}/gviz/tq?tqx=out:csv&sheet={tab}
+# from fixture files, the golden replay grids or generated grids, with optional latency,
+# injected errors, 404s for missing tabs and ETag/304 handling. Point the engine, the bot
+# and the standalone scripts at it with GVIZ_BASE_URL=http://127.0.0.1:{port}.
+#
+#   python schedule_gviz_stub.py serve --generate --latency 0.2
+#   python schedule_gviz_stub.py load --weeks 4 --rounds 3
+
+GOLDEN_MANIFEST = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "golden", "manifest.json")
+
+class GvizStubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, fixtures_dir=None, golden=False, generate=False, year=None,
+                 latency=0.0, jitter=0.0, error_rate=0.0, error_status=500, etags=True, seed=0):
+        super().__init__(address, GvizRequestHandler)
+        self.fixtures_dir = fixtures_dir
+        self.generate = generate
+        self.year = year or datetime.now().year
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.etags = etags
+        self.random = random.Random(seed)
+        self.tabs = {}
+        self.lock = threading.Lock()
+        self.stats = {'requests': 0, 'by_status': {}, 'bytes_sent': 0, 'in_flight': 0, 'max_in_flight': 0, 'by_tab': {}}
+        if golden:
+            with open(GOLDEN_MANIFEST, encoding='utf-8') as f:
+                manifest = json.load(f)
+            for case in manifest['cases']:
+                with open(os.path.join(os.path.dirname(GOLDEN_MANIFEST), case['grid']), 'rb') as f:
+                    self.tabs[(CHANNEL_CONFIG[case['channel']]['spreadsheet_id'], case['tab'])] = f.read()
+
+    @property
+    def base_url(self):
+        return f"http://{self.server_address[0]}:{self.server_address[1]}"
+
+    def find_tab(self, spreadsheet_id, tab):
+        """Looks the tab up in the fixture files, then the loaded grids, then generates it."""
+        with self.lock:
+            if (spreadsheet_id, tab) in self.tabs:
+                return self.tabs[(spreadsheet_id, tab)]
+        content = None
+        if self.fixtures_dir:
+            path = os.path.join(self.fixtures_dir, spreadsheet_id, f"{tab}.csv")
+            if os.path.isfile(path):
+                with open(path, 'rb') as f:
+                    content = f.read()
+        if content is None and self.generate:
+            config = next((config for config in CHANNEL_CONFIG.values() if config['spreadsheet_id'] == spreadsheet_id), None)
+            try:
+                week_start = datetime.strptime(f"{tab.split('-')[0].strip()} {self.year}", "%b %d %Y")
+            except ValueError:
+                week_start = None
+            if config and week_start:
+                content = make_grid(config, week_start.strftime("%Y-%m-%d"))
+        if content is not None:
+            with self.lock:
+                self.tabs[(spreadsheet_id, tab)] = content
+        return content
+
+    def count(self, tab, status, size):
+        with self.lock:
+            self.stats['requests'] += 1
+            self.stats['by_status'][str(status)] = self.stats['by_status'].get(str(status), 0) + 1
+            self.stats['bytes_sent'] += size
+            tab_stats = self.stats['by_tab'].setdefault(tab or '', {})
+            tab_stats[str(status)] = tab_stats.get(str(status), 0) + 1
+
+    def snapshot_stats(self):
+        with self.lock:
+            return json.loads(json.dumps(self.stats))
+
+class GvizRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive, like the real endpoint behind the shared session
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.stats['in_flight'] += 1
+            server.stats['max_in_flight'] = max(server.stats['max_in_flight'], server.stats['in_flight'])
+        try:
+            self.handle_gviz()
+        finally:
+            with server.lock:
+                server.stats['in_flight'] -= 1
+
+    def handle_gviz(self):
+        server = self.server
+        url = urlparse(self.path)
+        parts = url.path.strip('/').split('/')
+        query = parse_qs(url.query)
+        tab = query.get('sheet', [None])[0]
+        if len(parts) != 5 or parts[:2] != ['spreadsheets', 'd'] or parts[3:] != ['gviz', 'tq'] or query.get('tqx') != ['out:csv'] or not tab:
+            return self.reply(400, b"Unsupported request. Expected /spreadsheets/d/{id}/gviz/tq?tqx=out:csv&sheet={tab}", tab)
+
+        if server.latency or server.jitter:
+            time.sleep(max(0.0, server.latency + server.random.uniform(-server.jitter, server.jitter)))
+        if server.error_rate and server.random.random() < server.error_rate:
+            return self.reply(server.error_status, b"Injected error from the gviz stand-in.", tab)
+
+        content = server.find_tab(parts[2], tab)
+        if content is None:
+            return self.reply(404, f"No tab '{tab}' in spreadsheet {parts[2]}.".encode(), tab)
+        etag = f'"{hashlib.sha1(content).hexdigest()}"' if server.etags else None
+        if etag and self.headers.get('If-None-Match') == etag:
+            return self.reply(304, b"", tab, etag)
+        return self.reply(200, content, tab, etag, "text/csv; charset=utf-8")
+
+    def reply(self, status, body, tab, etag=None, content_type="text/plain; charset=utf-8"):
+        self.send_response(status)
+        if etag:
+            self.send_header("ETag", etag)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+        self.server.count(tab, status, len(body))
+
+    def log_message(self, format, *args):
+        pass
+
+def start_stub_server(host="127.0.0.1", port=0, **options):
+    """Starts the stand-in on a daemon thread; port 0 picks a free one (see server.base_url)."""
+    server = GvizStubServer((host, port), **options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))] if ordered else 0.0
+
+def run_load_test(args):
+    """Runs run_batch rounds against the stand-in and reports fetch, cache and server numbers."""
+    server = start_stub_server(generate=True, year=args.year, latency=args.latency, jitter=args.jitter,
+                               error_rate=args.error_rate, error_status=args.error_status, etags=not args.no_etags)
+    schedule_engine.GVIZ_BASE_URL = server.base_url
+    schedule_events.EVENT_LOG = ""
+    schedule_archive.ARCHIVE_PATH = ""
+    channels = args.channels or list(CHANNEL_CONFIG.keys())
+    first_day = datetime.strptime(f"{args.year}-{args.start}", "%Y-%m-%d")
+    week_starts = get_week_starts(first_day.strftime("%Y-%m-%d"), (first_day + timedelta(weeks=args.weeks - 1)).strftime("%Y-%m-%d"))
+    library_content = make_library(args.library_rows)
+    load_library(library_content)
+    print(f"Load testing {len(channels)} channels x {len(week_starts)} weeks x {args.rounds} rounds against {server.base_url}...", file=sys.stderr)
+
+    rounds = []
+    for round_number in range(1, args.rounds + 1):
+        with schedule_engine._grid_cache_lock:
+            schedule_engine._grid_cache.clear()  # Measure fetch and parse, not the incremental cache
+        started = time.perf_counter()
+        results = run_batch(channels, week_starts, library_content, max_workers=args.workers)
+        elapsed = time.perf_counter() - started
+        downloads = [timing['wall_seconds'] for result in results for timing in result['engine'].stage_timings if timing['stage'] == 'download']
+        succeeded = sum(1 for result in results if result['df'] is not None and not result['df'].empty)
+        rounds.append({
+            'round': round_number,
+            'runs': len(results),
+            'succeeded': succeeded,
+            'elapsed_seconds': round(elapsed, 3),
+            'runs_per_second': round(len(results) / elapsed, 2),
+            'download_p50_seconds': round(percentile(downloads, 0.50), 4),
+            'download_p95_seconds': round(percentile(downloads, 0.95), 4),
+            'run_p50_seconds': round(statistics.median(result['elapsed_seconds'] for result in results), 4)
+        })
+        print(f"  round {round_number}: {succeeded}/{len(results)} ok in {elapsed:.2f}s, "
+              f"download p50 {rounds[-1]['download_p50_seconds']}s p95 {rounds[-1]['download_p95_seconds']}s", file=sys.stderr)
+
+    cache = {f"{dict(key)['cache']}_{dict(key)['result']}": value for _, key, value in CACHE_REQUESTS.samples()}
+    report = {
+        'base_url': server.base_url,
+        'channels': channels,
+        'week_starts': week_starts,
+        'workers': args.workers,
+        'latency_seconds': args.latency,
+        'error_rate': args.error_rate,
+        'rounds': rounds,
+        'client_cache': cache,
+        'server': server.snapshot_stats()
+    }
+    server.shutdown()
+    print(json.dumps(report, indent=2))
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline stand-in for the Google Sheets gviz CSV export.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    def add_fault_options(subparser):
+        subparser.add_argument("--latency", type=float, default=0.0, help="Seconds to wait before each response.")
+        subparser.add_argument("--jitter", type=float, default=0.0, help="Random +/- seconds added to the latency.")
+        subparser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with --error-status.")
+        subparser.add_argument("--error-status", type=int, default=500)
+        subparser.add_argument("--no-etags", action="store_true", help="Don't send ETags or answer 304.")
+        subparser.add_argument("--year", type=int, default=datetime.now().year, help="Year of generated week tabs.")
+
+    serve_parser = subparsers.add_parser("serve", help="Serve tabs until interrupted.")
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=8765)
+    serve_parser.add_argument("--fixtures", help="Directory of {spreadsheet_id}/{TAB}.csv files.")
+    serve_parser.add_argument("--golden", action="store_true", help="Serve the golden replay grids.")
+    serve_parser.add_argument("--generate", action="store_true", help="Generate any configured channel's week tab on request.")
+    add_fault_options(serve_parser)
+
+    load_parser = subparsers.add_parser("load", help="Load-test concurrent fetches and caching against an in-process stand-in.")
+    load_parser.add_argument("channels", nargs="*", metavar="CHANNEL")
+    load_parser.add_argument("--start", default="03-02", help="Month-day of the first week (default 03-02).")
+    load_parser.add_argument("--weeks", type=int, default=4)
+    load_parser.add_argument("--rounds", type=int, default=3, help="Later rounds re-download with If-None-Match.")
+    load_parser.add_argument("--workers", type=int, default=schedule_engine.BATCH_MAX_WORKERS)
+    load_parser.add_argument("--library-rows", type=int, default=1000)
+    add_fault_options(load_parser)
+    args = parser.parse_args()
+
+    warnings.simplefilter('ignore', UserWarning)  # Date parsing warnings from the grid prep
+    if args.command == "load":
+        run_load_test(args)
+        return
+    if not (args.fixtures or args.golden or args.generate):
+        parser.error("serve needs at least one of --fixtures, --golden or --generate.")
+    server = GvizStubServer((args.host, args.port), fixtures_dir=args.fixtures, golden=args.golden, generate=args.generate,
+                            year=args.year, latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                            error_status=args.error_status, etags=not args.no_etags)
+    print(f"gviz stand-in listening on {server.base_url} (export GVIZ_BASE_URL={server.base_url})", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(json.dumps(server.snapshot_stats(), indent=2))
+
+if __name__ == "__main__":
+    main()
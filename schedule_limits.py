@@ -0,0 +1,38 @@
+import os
+from datetime import datetime
+
+# Scheduling limits shared by the engine's validations and the auto-fill solver, and the
+# parsing of a block's air time, which both need to tolerate blank time labels.
+
+# Content repeat check: the new week plus the channel's last REPEAT_LOOKBACK_WEEKS archived
+# weeks. A channel config can override the limits with 'repeat_max_airings' and
+# 'repeat_min_gap_hours'; 0 turns that check off.
+REPEAT_LOOKBACK_WEEKS = int(os.environ.get("REPEAT_LOOKBACK_WEEKS", "4"))
+REPEAT_MAX_AIRINGS = int(os.environ.get("REPEAT_MAX_AIRINGS", "12"))
+REPEAT_MIN_GAP_HOURS = float(os.environ.get("REPEAT_MIN_GAP_HOURS", "6"))
+
+# Valid content length (HH:MM, inclusive) for each slot length in minutes; the rest of a slot is ad breaks.
+VALID_DURATIONS = {
+    30: ("00:00", "00:25"), 60: ("00:26", "00:55"), 90: ("00:51", "01:15"),
+    120: ("01:16", "01:40"), 150: ("01:41", "02:05"), 180: ("02:06", "02:30"),
+    210: ("02:31", "02:55"), 240: ("02:56", "03:20"), 270: ("03:21", "03:45"),
+    300: ("03:46", "04:10"), 330: ("04:11", "04:35"), 360: ("04:36", "05:00")
+}
+
+def start_minutes(start_time):
+    """Minutes after midnight of an HH:MM start time, or None when it doesn't parse."""
+    try:
+        parsed = datetime.strptime(str(start_time), "%H:%M")
+    except ValueError:
+        return None
+    return parsed.hour * 60 + parsed.minute
+
+def parse_airtime(air_date, start_time):
+    """
+    The datetime of a block's MM/DD/YYYY air date and HH:MM start time, or None when
+    either doesn't parse. Grid prep leaves Start Time blank for a time label it can't read.
+    """
+    try:
+        return datetime.strptime(f"{air_date} {start_time}", "%m/%d/%Y %H:%M")
+    except ValueError:
+        return None
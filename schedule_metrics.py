@@ -0,0 +1,184 @@
+import os
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# In-process metrics in the Prometheus text format. Recording is always on and cheap;
+# the HTTP endpoint only runs when a front end calls start_metrics_server (the Slack bot
+# does when METRICS_PORT is set). No client library is needed, so it works offline.
+
+METRICS_PORT = os.environ.get("METRICS_PORT")
+METRICS_HOST = os.environ.get("METRICS_HOST", "127.0.0.1")
+DEFAULT_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+_registry = []
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels) + '}'
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Metric:
+    type_name = 'untyped'
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}, got {tuple(labels)}")
+        return tuple((name, str(labels[name])) for name in self.labelnames)
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, key, value) for key, value in self._values.items()]
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.type_name}"]
+        lines.extend(f"{name}{_format_labels(key)} {_format_value(value)}" for name, key, value in self.samples())
+        return lines
+
+class Counter(Metric):
+    type_name = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+class Gauge(Metric):
+    """A settable gauge, or one read at scrape time from collect() -> [(labels, value), ...]."""
+    type_name = 'gauge'
+
+    def __init__(self, name, help_text, labelnames=(), collect=None):
+        super().__init__(name, help_text, labelnames)
+        self.collect = collect
+        if not labelnames and collect is None:
+            self._values[()] = 0
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def samples(self):
+        if self.collect is None:
+            return super().samples()
+        return [(self.name, self._key(labels), value) for labels, value in self.collect()]
+
+class Histogram(Metric):
+    type_name = 'histogram'
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.setdefault(key, {'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0})
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state['buckets'][i] += 1
+            state['sum'] += value
+            state['count'] += 1
+
+    def samples(self):
+        with self._lock:
+            values = [(key, {'buckets': list(state['buckets']), 'sum': state['sum'], 'count': state['count']}) for key, state in self._values.items()]
+        samples = []
+        for key, state in values:
+            for bound, count in zip(self.buckets, state['buckets']):
+                samples.append((f"{self.name}_bucket", key + (('le', _format_value(bound)),), count))
+            samples.append((f"{self.name}_sum", key, state['sum']))
+            samples.append((f"{self.name}_count", key, state['count']))
+        return samples
+
+def render_metrics():
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+_sample_pattern = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(?:\{(.*)\})?\s+(\S+)$')
+_label_pattern = re.compile(r'([a-zA-Z_][a-zA-Z0-9_]*)="((?:[^"\\]|\\.)*)"')
+
+def parse_metrics(text):
+    """Reads exposition text back into {(name, ((label, value), ...)): value}, for scrapers and load tests."""
+    samples = {}
+    for line in text.splitlines():
+        match = _sample_pattern.match(line.strip())
+        if not match or line.startswith('#'):
+            continue
+        name, labels, value = match.groups()
+        label_pairs = tuple((label, raw.replace('\\"', '"').replace('\\n', '\n').replace('\\\\', '\\')) for label, raw in _label_pattern.findall(labels or ''))
+        samples[(name, label_pairs)] = float(value)
+    return samples
+
+# --- Metrics recorded by the engine and the Slack bot ---
+
+REQUESTS = Counter("schedule_bot_requests_total", "Slack commands, actions and modal submissions handled.", ["command"])
+CHANNEL_PROCESSING_SECONDS = Histogram("schedule_channel_processing_seconds", "Wall time of one channel run.", ["channel", "mode"])
+CACHE_REQUESTS = Counter("schedule_cache_requests_total", "Lookups in the library, grid download, cell state, cell parse, incremental grid and ETag caches.", ["cache", "result"])
+ACTIVE_WORKERS = Gauge("schedule_active_workers", "Channel runs currently executing on a worker thread.")
+QUEUED_RUNS = Gauge("schedule_queued_runs", "Channel runs submitted and waiting for a worker thread.")
+SLACK_API_RETRIES = Counter("schedule_slack_api_retries_total", "Slack Web API calls retried by the client.", ["reason"])
+GRID_DOWNLOAD_FAILURES = Counter("schedule_grid_download_failures_total", "Failed grid downloads by HTTP status code.", ["status"])
+
+def _cache_hit_ratios():
+    totals = {}
+    for _, key, value in CACHE_REQUESTS.samples():
+        labels = dict(key)
+        hits, lookups = totals.get(labels['cache'], (0, 0))
+        totals[labels['cache']] = (hits + (value if labels['result'] == 'hit' else 0), lookups + value)
+    return [({'cache': cache}, hits / lookups) for cache, (hits, lookups) in totals.items() if lookups]
+
+CACHE_HIT_RATIO = Gauge("schedule_cache_hit_ratio", "Share of cache lookups served from the cache.", ["cache"], collect=_cache_hit_ratios)
+PYTHON_THREADS = Gauge("schedule_python_threads", "Live Python threads in the process.", collect=lambda: [({}, threading.active_count())])
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = render_metrics().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Scrapes every few seconds would drown the bot's own output
+
+def start_metrics_server(port=None, host=METRICS_HOST):
+    """Serves /metrics on a daemon thread and returns the server."""
+    server = ThreadingHTTPServer((host, int(port if port is not None else METRICS_PORT)), _MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,77 @@
+import io
+import os
+import re
+import time
+import pstats
+import cProfile
+import threading
+import tracemalloc
+from datetime import datetime
+
+# Opt-in profiling of single runs. Nothing here is active unless a run asks for it: the
+# Slack modal's "Profile this run" option, or SCHEDULE_PROFILE=1 to profile every run.
+
+PROFILE_ALL_RUNS = os.environ.get("SCHEDULE_PROFILE", "0") == "1"
+PROFILE_DIR = os.environ.get("SCHEDULE_PROFILE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "logs", "profiles"))
+PROFILE_TOP_FUNCTIONS = 30
+PROFILE_TOP_ALLOCATIONS = 20
+
+# tracemalloc is process-wide and only one cProfile profiler can be active at a time,
+# so profiled runs take turns; runs without profiling never touch this lock.
+_profile_lock = threading.Lock()
+
+def profile_call(label, function, *args, **kwargs):
+    """
+    Runs function under cProfile and tracemalloc. Returns (result, report, pstats_path):
+    the report lists the top functions by cumulative time and the top allocation sites,
+    and the raw pstats dump is saved under PROFILE_DIR for snakeviz/pstats.
+    """
+    with _profile_lock:
+        was_tracing = tracemalloc.is_tracing()
+        if not was_tracing:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        profiler.enable()
+        try:
+            result = function(*args, **kwargs)
+        finally:
+            profiler.disable()
+            elapsed = time.perf_counter() - started
+            snapshot = tracemalloc.take_snapshot()
+            _, peak_bytes = tracemalloc.get_traced_memory()
+            if not was_tracing:
+                tracemalloc.stop()
+
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    safe_label = re.sub(r'[^A-Za-z0-9_.-]+', '_', label).strip('_')
+    pstats_path = os.path.join(PROFILE_DIR, f"{safe_label}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pstats")
+    profiler.dump_stats(pstats_path)
+
+    stats_buffer = io.StringIO()
+    pstats.Stats(profiler, stream=stats_buffer).strip_dirs().sort_stats('cumulative').print_stats(PROFILE_TOP_FUNCTIONS)
+
+    snapshot = snapshot.filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        tracemalloc.Filter(False, "<unknown>")
+    ))
+    allocation_lines = [
+        f"{stat.size / 1024:10.1f} KiB {stat.count:8} blocks  {stat.traceback[0].filename}:{stat.traceback[0].lineno}"
+        for stat in snapshot.statistics('lineno')[:PROFILE_TOP_ALLOCATIONS]
+    ]
+
+    report = "\n".join([
+        f"Profile of {label}",
+        f"Wall time: {elapsed:.3f}s | Peak traced memory: {peak_bytes / (1024 * 1024):.1f} MiB",
+        f"Raw pstats: {pstats_path}",
+        "",
+        f"--- Top {PROFILE_TOP_FUNCTIONS} functions by cumulative time ---",
+        stats_buffer.getvalue().strip(),
+        "",
+        f"--- Top {PROFILE_TOP_ALLOCATIONS} allocation sites still held at the end of the run ---",
+        "(tracemalloc is process-wide, so concurrent runs in the same process can appear here)",
+        *allocation_lines
+    ])
+    return result, report, pstats_path
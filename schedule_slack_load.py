@@ -0,0 +1,324 @@
+import os
+import io
+import sys
+import json
+import math
+import time
+import random
+import argparse
+import warnings
+import threading
+import contextlib
+import importlib.util
+from collections import Counter
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from slack_sdk.errors import SlackApiError
+from slack_sdk.web.slack_response import SlackResponse
+import schedule_engine
+import schedule_events
+import schedule_archive
+from schedule_engine import CHANNEL_CONFIG
+from schedule_fixtures import make_library
+from schedule_gviz_stub import percentile, start_stub_server
+from schedule_metrics import REQUESTS, SLACK_API_RETRIES
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Load driver for the Slack bot's modal handlers. ott-slack.py is imported offline and its
+# handlers are called directly with a FakeSlackClient, which records every Web API call
+# and rate limits them the way Slack does. Grids come from the gviz stand-in and the
+# library CSV from a local file server, so the whole request path runs without a workspace.
+#
+#   python schedule_slack_load.py --submissions 50 --concurrency 10
+
+BOT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ott-slack.py")
+# Bolt runs listeners on a pool of 10 threads by default, so that is the concurrency one bot process sees
+BOLT_LISTENER_THREADS = 10
+
+# Per-minute limit, burst size and whether the limit is per channel, after Slack's rate limit tiers
+SLACK_RATE_LIMITS = {
+    'conversations_open': (50, 10, False),
+    'files_list': (50, 10, False),
+    'files_upload_v2': (100, 20, False),
+    'views_open': (100, 20, False),
+    'views_update': (100, 20, False),
+    'chat_postMessage': (60, 3, True)  # About one message per second per channel
+}
+
+# Modal submissions the driver picks from, with their default weights
+SCENARIOS = {
+    'single': 4,      # One channel, one week
+    'siblings': 2,    # Every channel on one spreadsheet
+    'all': 1,         # Every channel
+    'multi_week': 2,  # A few channels over a few weeks
+    'validate': 1     # The validation modal
+}
+
+def log(message):
+    print(message, file=sys.__stderr__, flush=True)
+
+class RateLimiter:
+    """Token buckets per method (and channel), shared by every client of one fake workspace."""
+    def __init__(self, limits=SLACK_RATE_LIMITS, scale=1.0):
+        self.limits = limits
+        self.scale = scale
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def acquire(self, method, channel=None):
+        """Takes a token and returns 0, or returns the seconds until one is available."""
+        if method not in self.limits or not self.scale:
+            return 0.0
+        per_minute, burst, per_channel = self.limits[method]
+        rate = per_minute * self.scale / 60
+        key = (method, channel if per_channel else None)
+        with self.lock:
+            now = time.monotonic()
+            tokens, updated = self.buckets.get(key, (burst, now))
+            tokens = min(burst, tokens + (now - updated) * rate)
+            if tokens >= 1:
+                self.buckets[key] = (tokens - 1, now)
+                return 0.0
+            self.buckets[key] = (tokens, now)
+            return (1 - tokens) / rate
+
+class FakeSlackClient:
+    """
+    Stands in for slack_sdk's WebClient in the bot's handlers. Calls are recorded in
+    self.calls and answered after api_latency seconds. A rate-limited call is retried
+    after its Retry-After like the bot's retry handlers do (counted in SLACK_API_RETRIES),
+    and raises SlackApiError once max_rate_limit_retries is used up.
+    """
+    def __init__(self, library_url, library_name="library.csv", rate_limiter=None, api_latency=0.0, max_rate_limit_retries=1):
+        self.library_url = library_url
+        self.library_name = library_name
+        self.rate_limiter = rate_limiter or RateLimiter(scale=0)
+        self.api_latency = api_latency
+        self.max_rate_limit_retries = max_rate_limit_retries
+        self.calls = []
+        self.lock = threading.Lock()
+        self._ts = 0
+
+    def _call(self, method, channel=None, **details):
+        started = time.perf_counter()
+        retries = 0
+        while True:
+            wait = self.rate_limiter.acquire(method, channel)
+            if not wait:
+                break
+            if retries >= self.max_rate_limit_retries:
+                self._record(method, channel, started, retries, 'ratelimited', details)
+                response = SlackResponse(client=self, http_verb="POST", api_url=f"https://slack.com/api/{method.replace('_', '.')}",
+                                         req_args={}, data={'ok': False, 'error': 'ratelimited'},
+                                         headers={'Retry-After': str(math.ceil(wait))}, status_code=429)
+                raise SlackApiError("The request to the Slack API failed. (ratelimited)", response)
+            SLACK_API_RETRIES.inc(reason="rate_limited")
+            retries += 1
+            time.sleep(wait)
+        if self.api_latency:
+            time.sleep(self.api_latency)
+        self._record(method, channel, started, retries, 'ok', details)
+
+    def _record(self, method, channel, started, retries, outcome, details):
+        with self.lock:
+            self.calls.append({'method': method, 'channel': channel, 'seconds': time.perf_counter() - started,
+                               'retries': retries, 'outcome': outcome, **details})
+
+    def _next_ts(self):
+        with self.lock:
+            self._ts += 1
+            return f"{time.time():.0f}.{self._ts:06d}"
+
+    def conversations_open(self, users, **kwargs):
+        self._call('conversations_open')
+        return {'ok': True, 'channel': {'id': f"D{users}"}}
+
+    def files_list(self, user=None, **kwargs):
+        self._call('files_list')
+        return {'ok': True, 'files': [{'name': self.library_name, 'url_private_download': self.library_url}]}
+
+    def chat_postMessage(self, channel, text="", thread_ts=None, **kwargs):
+        self._call('chat_postMessage', channel, text_length=len(text), in_thread=thread_ts is not None,
+                   critical=text.startswith("Sorry, a critical error"))
+        return {'ok': True, 'channel': channel, 'ts': self._next_ts()}
+
+    def files_upload_v2(self, channel, content="", filename=None, **kwargs):
+        self._call('files_upload_v2', channel, filename=filename, content_bytes=len(content.encode() if isinstance(content, str) else content))
+        return {'ok': True, 'file': {'id': f"F{self._next_ts()}", 'name': filename}}
+
+    def views_open(self, trigger_id, view, **kwargs):
+        self._call('views_open')
+        return {'ok': True, 'view': {'id': f"V{self._next_ts()}", **view}}
+
+    def views_update(self, view_id, view, **kwargs):
+        self._call('views_update')
+        return {'ok': True, 'view': {'id': view_id, **view}}
+
+class _LibraryHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = self.server.content
+        self.send_response(200)
+        self.send_header("Content-Type", "text/csv; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def serve_library(library_content):
+    """Serves the library CSV on a free local port, standing in for url_private_download."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _LibraryHandler)
+    server.daemon_threads = True
+    server.content = library_content.encode()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/files/library.csv"
+
+def load_bot(path=BOT_PATH):
+    """Imports ott-slack.py without a workspace; the handlers stay plain functions."""
+    os.environ["SLACK_OFFLINE"] = "1"
+    os.environ.setdefault("SLACK_BOT_TOKEN", "xoxb-offline")
+    os.environ.setdefault("SLACK_SIGNING_SECRET", "offline")
+    spec = importlib.util.spec_from_file_location("ott_slack", path)
+    bot = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(bot)
+    return bot
+
+def make_submission(rng, scenario, user_id, start_date):
+    """Builds the body and view of one modal submission for the given scenario."""
+    channel_names = list(CHANNEL_CONFIG)
+    end_date = None
+    if scenario == 'single':
+        channels = [rng.choice(channel_names)]
+    elif scenario == 'siblings':
+        spreadsheet_id = CHANNEL_CONFIG[rng.choice(channel_names)]['spreadsheet_id']
+        channels = [name for name in channel_names if CHANNEL_CONFIG[name]['spreadsheet_id'] == spreadsheet_id]
+    elif scenario == 'all':
+        channels = channel_names
+    else:
+        channels = rng.sample(channel_names, rng.randint(1, 3))
+        if scenario == 'multi_week':
+            end_date = (start_date + timedelta(weeks=rng.randint(1, 3))).strftime("%Y-%m-%d")
+    values = {
+        'channel_block': {'channel_checkboxes': {'selected_options': [{'value': name} for name in channels]}},
+        'date_block': {'date_select': {'selected_date': start_date.strftime("%Y-%m-%d")}}
+    }
+    if end_date:
+        values['end_date_block'] = {'end_date_select': {'selected_date': end_date}}
+    return {'user': {'id': user_id}}, {'state': {'values': values}}, channels
+
+def run_submission(bot, client, scenario, body, view):
+    """Calls the bot's handler for one submission and times the ack and the whole run."""
+    acked = {}
+    started = time.perf_counter()
+
+    def ack(**kwargs):
+        acked['seconds'] = time.perf_counter() - started
+        acked['errors'] = kwargs.get('errors')
+
+    handler = bot.handle_validation_modal_submission if scenario == 'validate' else bot.handle_modal_submission
+    handler(ack=ack, body=body, client=client, view=view)
+    return {'scenario': scenario, 'seconds': time.perf_counter() - started, 'ack_seconds': acked.get('seconds'), 'ack_errors': acked.get('errors')}
+
+def peak_rss_mib():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)  # Bytes on macOS, KiB on Linux
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        if name not in SCENARIOS:
+            raise argparse.ArgumentTypeError(f"Unknown scenario '{name}'. Choose from: {', '.join(SCENARIOS)}.")
+        mix[name] = float(weight or 1)
+    return mix
+
+def run_load(args):
+    start_date = datetime.strptime(args.start, "%Y-%m-%d")
+    stub = start_stub_server(generate=True, year=start_date.year, latency=args.grid_latency)
+    schedule_engine.GVIZ_BASE_URL = stub.base_url
+    schedule_events.EVENT_LOG = ""
+    schedule_archive.ARCHIVE_PATH = ""
+    library_server, library_url = serve_library(make_library(args.library_rows))
+    bot = load_bot()
+    client = FakeSlackClient(library_url, rate_limiter=RateLimiter(scale=args.rate_limit_scale), api_latency=args.api_latency)
+
+    rng = random.Random(args.seed)
+    mix = args.mix or SCENARIOS
+    submissions = []
+    for i in range(args.submissions):
+        scenario = rng.choices(list(mix), weights=list(mix.values()))[0]
+        submissions.append((scenario, *make_submission(rng, scenario, f"U{i % args.users:04d}", start_date)))
+    log(f"Firing {args.submissions} modal submissions from {args.users} users, {args.concurrency} at a time "
+        f"({', '.join(f'{name} {count}' for name, count in Counter(s[0] for s in submissions).items())})...")
+
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):  # Engine warnings
+        with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+            results = list(executor.map(lambda submission: run_submission(bot, client, submission[0], submission[1], submission[2]), submissions))
+    elapsed = time.perf_counter() - started
+    stub.shutdown()
+    library_server.shutdown()
+
+    latencies = [result['seconds'] for result in results]
+    ack_latencies = [result['ack_seconds'] for result in results if result['ack_seconds'] is not None]
+    calls = client.calls
+    channel_runs = sum(len(s[3]) * len(schedule_engine.get_week_starts(s[2]['state']['values']['date_block']['date_select']['selected_date'],
+                                                                       s[2]['state']['values'].get('end_date_block', {}).get('end_date_select', {}).get('selected_date')))
+                       for s in submissions)
+    report = {
+        'submissions': len(results),
+        'concurrency': args.concurrency,
+        'users': args.users,
+        'channel_runs': channel_runs,
+        'elapsed_seconds': round(elapsed, 3),
+        'submissions_per_second': round(len(results) / elapsed, 3),
+        'channel_runs_per_second': round(channel_runs / elapsed, 3),
+        'latency_seconds': {'p50': round(percentile(latencies, 0.50), 3), 'p95': round(percentile(latencies, 0.95), 3), 'max': round(max(latencies), 3)},
+        'ack_seconds': {'p50': round(percentile(ack_latencies, 0.50), 4), 'p95': round(percentile(ack_latencies, 0.95), 4)},
+        'by_scenario': {
+            name: {'count': len(values), 'p50_seconds': round(percentile(values, 0.50), 3), 'p95_seconds': round(percentile(values, 0.95), 3)}
+            for name in mix if (values := [result['seconds'] for result in results if result['scenario'] == name])
+        },
+        'peak_rss_mib': peak_rss_mib(),
+        'slack_calls': dict(Counter(call['method'] for call in calls)),
+        'slack_rate_limited': {
+            'retried': sum(call['retries'] for call in calls),
+            'failed': sum(1 for call in calls if call['outcome'] == 'ratelimited')
+        },
+        'uploads': sum(1 for call in calls if call['method'] == 'files_upload_v2' and call['outcome'] == 'ok'),
+        'critical_errors': sum(1 for call in calls if call.get('critical')),
+        'bot_requests': {dict(key)['command']: value for _, key, value in REQUESTS.samples()},
+        'gviz_requests': stub.snapshot_stats()['by_status']
+    }
+    log(f"Done in {elapsed:.2f}s: {report['submissions_per_second']} submissions/s, p50 {report['latency_seconds']['p50']}s, "
+        f"p95 {report['latency_seconds']['p95']}s, peak RSS {report['peak_rss_mib']} MiB, "
+        f"{report['slack_rate_limited']['retried']} rate-limit retries, {report['critical_errors']} critical errors")
+    print(json.dumps(report, indent=2))
+
+def main():
+    parser = argparse.ArgumentParser(description="Fire concurrent modal submissions at the Slack bot's handlers with a fake Slack client.")
+    parser.add_argument("--submissions", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=BOLT_LISTENER_THREADS, help=f"Submissions handled at once (Bolt's default is {BOLT_LISTENER_THREADS}).")
+    parser.add_argument("--users", type=int, default=5, help="Distinct users, i.e. DM channels sharing the per-channel rate limit.")
+    parser.add_argument("--mix", type=parse_mix, help=f"Scenario weights, e.g. single=4,all=1 (default: {','.join(f'{k}={v}' for k, v in SCENARIOS.items())}).")
+    parser.add_argument("--start", default="2026-03-02", help="Week the submissions pick (YYYY-MM-DD).")
+    parser.add_argument("--library-rows", type=int, default=10000)
+    parser.add_argument("--api-latency", type=float, default=0.05, help="Seconds per Slack API call.")
+    parser.add_argument("--grid-latency", type=float, default=0.2, help="Seconds per grid download.")
+    parser.add_argument("--rate-limit-scale", type=float, default=1.0, help="Multiplies Slack's rate limits; 0 disables them.")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    warnings.simplefilter('ignore', UserWarning)  # Date parsing warnings from the grid prep
+    run_load(args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+import numpy as np
+import pandas as pd
+from schedule_engine import CHANNEL_CONFIG
+
+# Gap and overlap check of a combined schedule sheet before it goes out. Every
+# (linear_channel, date) becomes one row of a minute-resolution occupancy matrix - how many
+# slots cover each of the day's 1440 minutes - built for all channels and days at once with
+# a difference array and a cumulative sum. Zero is a gap, more than one an overlap.
+
+MINUTES_PER_DAY = 1440
+TIMELINE_COLUMNS = ['linear_channel', 'date', 'time_slot', 'slot_duration']
+
+def _slot_times(master_df):
+    """
+    (days, start minutes, end minutes) of every slot, NaT or NaN where the date, time slot
+    or duration doesn't parse; grid prep leaves time_slot blank for an unreadable time label.
+    """
+    days = pd.to_datetime(master_df['date'].astype(str), format="%m/%d/%Y", errors="coerce")
+    times = pd.to_datetime(master_df['time_slot'].astype(str), format="%H:%M", errors="coerce")
+    starts = times.dt.hour * 60 + times.dt.minute
+    return days, starts, starts + pd.to_numeric(master_df['slot_duration'], errors="coerce")
+
+def build_timelines(master_df):
+    """
+    Returns (keys, occupancy): keys is a MultiIndex of (linear_channel, date) and row i of
+    the int array occupancy counts the slots covering each minute of that channel-day.
+    Slots running past midnight continue on the channel's next day when it is in the sheet.
+    Slots without a readable date, time slot or duration are left out.
+    """
+    days, starts, ends = _slot_times(master_df)
+    readable = (days.notna() & ends.notna()).to_numpy()
+    channels = master_df['linear_channel'].astype(str).to_numpy()[readable]
+    days = days.to_numpy()[readable]
+    starts = starts.to_numpy()[readable].astype(int)
+    ends = ends.to_numpy()[readable].astype(int)
+
+    keys = pd.MultiIndex.from_arrays([channels, days]).unique().sort_values()
+    spill = ends > MINUTES_PER_DAY
+    rows = np.concatenate([
+        keys.get_indexer(pd.MultiIndex.from_arrays([channels, days])),
+        keys.get_indexer(pd.MultiIndex.from_arrays([channels[spill], days[spill] + np.timedelta64(1, 'D')]))
+    ])
+    interval_starts = np.concatenate([starts, np.zeros(spill.sum(), dtype=starts.dtype)])
+    interval_ends = np.concatenate([np.minimum(ends, MINUTES_PER_DAY), ends[spill] - MINUTES_PER_DAY])
+    in_sheet = rows >= 0  # Spill into a day the sheet doesn't cover is outside its timeline
+
+    diff = np.zeros((len(keys), MINUTES_PER_DAY + 1), dtype=np.int32)
+    np.add.at(diff, (rows[in_sheet], interval_starts[in_sheet]), 1)
+    np.add.at(diff, (rows[in_sheet], interval_ends[in_sheet]), -1)
+    return keys, np.cumsum(diff[:, :MINUTES_PER_DAY], axis=1)
+
+def _runs(mask):
+    """(row, first minute, end minute) of every run of True in each row, for all rows at once."""
+    padded = np.zeros((mask.shape[0], mask.shape[1] + 2), dtype=np.int8)
+    padded[:, 1:-1] = mask
+    edges = np.diff(padded, axis=1)
+    run_starts, run_ends = np.argwhere(edges == 1), np.argwhere(edges == -1)  # Row-major, so they pair up
+    return run_starts[:, 0], run_starts[:, 1], run_ends[:, 1]
+
+def _hhmm(minute):
+    return f"{minute // 60:02}:{minute % 60:02}"
+
+def check_timelines(sheets):
+    """
+    Finds gaps, overlaps and coverage shortfalls in the per-channel sheets of one combined
+    upload. Returns a list of issues sorted by channel and day; a day a channel has no
+    slots on at all, while other channels in the upload do, is reported as missing.
+    """
+    sheets = [df[TIMELINE_COLUMNS] for df in sheets if df is not None and not df.empty]
+    if not sheets:
+        return []
+    master_df = pd.concat(sheets, ignore_index=True)
+    keys, occupancy = build_timelines(master_df)
+    labels = {str(config['linear_channel_id']): config['output_prefix'] for config in CHANNEL_CONFIG.values()}
+    issues = []
+
+    days, _, ends = _slot_times(master_df)
+    unreadable = master_df[(days.isna() | ends.isna()).to_numpy()]
+    unreadable_days = set()
+    for (channel, raw_date), slots in unreadable.groupby([unreadable['linear_channel'].astype(str), unreadable['date'].astype(str)]).size().items():
+        day = pd.to_datetime(raw_date, format="%m/%d/%Y", errors="coerce")
+        unreadable_days.add((channel, day))
+        issues.append({'linear_channel': channel, 'date': day, 'raw_date': raw_date, 'kind': 'unreadable', 'slots': int(slots), 'minutes': 0})
+
+    for kind, mask in (('gap', occupancy == 0), ('overlap', occupancy > 1)):
+        rows, firsts, ends = _runs(mask)
+        for row, first, end in zip(rows, firsts, ends):
+            issues.append({'linear_channel': keys[row][0], 'date': keys[row][1], 'kind': kind, 'start': _hhmm(first), 'end': _hhmm(end), 'minutes': int(end - first)})
+
+    covered = (occupancy > 0).sum(axis=1)
+    for row in np.flatnonzero(covered < MINUTES_PER_DAY):
+        issues.append({'linear_channel': keys[row][0], 'date': keys[row][1], 'kind': 'shortfall', 'minutes': int(MINUTES_PER_DAY - covered[row])})
+
+    all_days = keys.get_level_values(1).unique()
+    for channel in keys.get_level_values(0).unique():
+        for day in all_days.difference(keys[keys.get_level_values(0) == channel].get_level_values(1)):
+            if (channel, day) in unreadable_days:
+                continue  # It has slots, just none with a time the check can place
+            issues.append({'linear_channel': channel, 'date': day, 'kind': 'missing_day', 'minutes': MINUTES_PER_DAY})
+
+    order = {'unreadable': 0, 'missing_day': 1, 'shortfall': 2, 'gap': 3, 'overlap': 4}
+    issues.sort(key=lambda issue: (issue['linear_channel'], issue['date'] if pd.notna(issue['date']) else pd.Timestamp.max, order[issue['kind']], issue.get('start', '')))
+    for issue in issues:
+        issue['channel'] = labels.get(issue['linear_channel'], issue['linear_channel'])
+        raw_date = issue.pop('raw_date', None)
+        issue['date'] = pd.Timestamp(issue['date']).strftime("%m/%d/%Y") if pd.notna(issue['date']) else raw_date
+    return issues
+
+def format_timeline_report(issues):
+    """The issues as a warning section in the engine's log format, or "" when there are none."""
+    if not issues:
+        return ""
+    lines = ["--- WARNING: SCHEDULE TIMELINE GAPS AND OVERLAPS ---"]
+    for issue in issues:
+        if issue['kind'] == 'unreadable':
+            lines.append(f"{issue['channel']} on {issue['date']}: {issue['slots']} slots have no readable time slot and were left out of the check.")
+        elif issue['kind'] == 'missing_day':
+            lines.append(f"{issue['channel']} on {issue['date']}: no slots at all.")
+        elif issue['kind'] == 'shortfall':
+            lines.append(f"{issue['channel']} on {issue['date']}: slots cover {_hhmm(MINUTES_PER_DAY - issue['minutes'])} of 24:00.")
+        else:
+            lines.append(f"{issue['channel']} on {issue['date']}:\n  > {issue['kind'].capitalize()} from {issue['start']} to {issue['end']} ({issue['minutes']} min).")
+    return "\n".join(lines)
+
+def timeline_report(sheets):
+    """
+    The report the front ends post before the sheet goes out. The check only warns, so an
+    error in it becomes the report instead of stopping the upload or write.
+    """
+    try:
+        return format_timeline_report(check_timelines(sheets))
+    except Exception as e:
+        return f"--- WARNING: THE TIMELINE CHECK FAILED ---\n{type(e).__name__}: {e}"
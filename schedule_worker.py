@@ -0,0 +1,192 @@
+import os
+import sys
+import json
+import time
+import threading
+from contextlib import contextmanager
+
+# Imported up front so channel runs don't pay for it; this process stays warm for the
+# lifetime of the desktop GUI.
+import pandas as pd
+import requests
+from schedule_engine import CHANNEL_CONFIG, ProcessingEngine, load_library, run_batch, write_combined_schedule
+from schedule_timeline import timeline_report
+
+# Long-lived worker for the desktop GUI. Commands arrive as JSON lines on stdin and
+# events go back as JSON lines on stdout, starting with
+# {"event": "ready", "pid": ..., "channels": [...]} once the imports are done:
+#   {"cmd": "load_library", "path": ...}
+#       -> {"event": "library", "path": ..., "ok": ..., "rows": ..., "seconds": ..., "message": ...}
+#   {"cmd": "run", "job_id": ..., "channel": ..., "date": ..., "library_path": ..., "output_dir": ...}
+#       -> {"event": "output", "job_id": ..., "data": ...} for every log line, then
+#          {"event": "exit", "job_id": ..., "code": 0 | 1, "output_file": ...}
+#   {"cmd": "batch", "job_id": ..., "channels": [...], "date": ..., "library_path": ..., "output_dir": ...}
+#       -> {"event": "status", "job_id": ..., "channel": ..., "status": "running" | "success" | "failed",
+#           "elapsed_seconds": ...} per channel, "output" events, then one "exit" for the whole batch
+#   {"cmd": "cancel", "job_id": ...}
+#       -> the job's runs stop at their next stage and its "exit" comes with code 1
+# The worker exits when stdin is closed.
+
+# The sheet each standalone schedule script writes, so a channel run here leaves the same
+# file in Downloads: <prefix>_Schedule_Sheet_<WEEK>.csv with the script's columns. Channels
+# without a script write the engine's sheet under their output_prefix.
+STANDARD_SCRIPT_COLUMNS = ['date', 'linear_channel', 'content', 'randomize_content', 'slot_duration', 'time_slot']
+PLL_SCRIPT_COLUMNS = ['date', 'linear_channel', 'slot_duration', 'time_slot', 'content', 'randomize_content', 'bumpers_in', 'bumpers_out']
+SCRIPT_SHEETS = {
+    'ACL': ('ACL', STANDARD_SCRIPT_COLUMNS),
+    'Bark': ('BarkTV', STANDARD_SCRIPT_COLUMNS),
+    'Billiard': ('BilliardTV', STANDARD_SCRIPT_COLUMNS),
+    'PowerSports World': ('PowerSportsWorld', STANDARD_SCRIPT_COLUMNS),
+    'PLL Domestic': ('PLL_Domestic', PLL_SCRIPT_COLUMNS),
+    'PLL International': ('PLL_International', PLL_SCRIPT_COLUMNS)
+}
+
+write_lock = threading.Lock()
+state_lock = threading.Lock()
+library_state = {'key': None, 'content': None}
+cancelled_jobs = set()
+
+def send(event):
+    with write_lock:
+        sys.stdout.write(json.dumps(event) + "\n")
+        sys.stdout.flush()
+
+def is_cancelled(job_id):
+    with state_lock:
+        return job_id in cancelled_jobs
+
+class JobCancelled(Exception):
+    pass
+
+class StreamingEngine(ProcessingEngine):
+    """
+    A ProcessingEngine that also streams each log line back to the GUI as it happens, and
+    stops at the next stage once its job is cancelled.
+    """
+    def __init__(self, job_id, *args, label=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.job_id = job_id
+        self.label = label
+
+    @contextmanager
+    def _stage(self, name):
+        if is_cancelled(self.job_id):
+            raise JobCancelled(f"Job {self.job_id} was cancelled before the {name} stage.")
+        with super()._stage(name) as record:
+            yield record
+
+    def log(self, message):
+        super().log(message)
+        if not is_cancelled(self.job_id):
+            # Batch runs tag each line with its channel since several stream at once
+            data = f"[{self.label}] {message}" if self.label else message
+            send({'event': 'output', 'job_id': self.job_id, 'data': data + "\n"})
+
+def load_library_file(path):
+    """
+    Reads and indexes the library once; later runs re-use it until the file at that path
+    changes, e.g. when the library is re-exported over the old one.
+    """
+    stat = os.stat(path)
+    key = (path, stat.st_mtime_ns, stat.st_size)
+    with state_lock:
+        if library_state['key'] == key:
+            return library_state['content']
+    with open(path, encoding='utf-8') as f:
+        content = f.read()
+    load_library(content)
+    with state_lock:
+        library_state['key'], library_state['content'] = key, content
+    return content
+
+def handle_load_library(command):
+    started = time.perf_counter()
+    try:
+        content = load_library_file(command['path'])
+        send({'event': 'library', 'path': command['path'], 'ok': True, 'rows': len(load_library(content)),
+              'seconds': round(time.perf_counter() - started, 3), 'message': ''})
+    except Exception as e:
+        send({'event': 'library', 'path': command['path'], 'ok': False, 'rows': 0,
+              'seconds': round(time.perf_counter() - started, 3), 'message': str(e)})
+
+def run_job(command):
+    job_id = command['job_id']
+    config = CHANNEL_CONFIG[command['channel']]
+    output_file = None
+    try:
+        library_content = load_library_file(command['library_path'])
+        engine = StreamingEngine(job_id, config, command['date'], library_content)
+        engine.log(f"\n{time.strftime('%Y-%m-%d %H:%M:%S')} | Creating {config['output_prefix']} schedule for {command['date']}...")
+        final_df = engine.run()
+        if final_df is not None and not is_cancelled(job_id):
+            week_name, _ = engine._get_week_name_of_input_date(command['date'])
+            os.makedirs(command['output_dir'], exist_ok=True)
+            prefix, columns = SCRIPT_SHEETS.get(command['channel'], (config['output_prefix'], list(final_df.columns)))
+            output_file = os.path.join(command['output_dir'], f"{prefix}_Schedule_Sheet_{week_name.upper()}.csv")
+            final_df[columns].to_csv(output_file, index=False)
+            engine.log(f"Schedule sheet saved to {output_file}!")
+    except Exception as e:
+        if not is_cancelled(job_id):
+            send({'event': 'output', 'job_id': job_id, 'data': f"\n[ERROR] {e}\n"})
+    send({'event': 'exit', 'job_id': job_id, 'code': 0 if output_file else 1, 'output_file': output_file})
+    with state_lock:
+        cancelled_jobs.discard(job_id)
+
+def run_batch_job(command):
+    """Runs the selected channels in parallel on one shared library and writes one combined sheet."""
+    job_id = command['job_id']
+    output_file = None
+    try:
+        library_content = load_library_file(command['library_path'])
+        channel_names = {config['output_prefix']: name for name, config in CHANNEL_CONFIG.items()}
+
+        def report_result(result):
+            succeeded = result['df'] is not None and not result['df'].empty
+            send({'event': 'status', 'job_id': job_id, 'channel': result['channel'], 'status': 'success' if succeeded else 'failed',
+                  'elapsed_seconds': round(result['elapsed_seconds'], 2)})
+
+        def engine_factory(config, *args, **kwargs):
+            # Called on the pool thread, so this is when the channel actually starts
+            send({'event': 'status', 'job_id': job_id, 'channel': channel_names[config['output_prefix']], 'status': 'running', 'elapsed_seconds': 0})
+            return StreamingEngine(job_id, config, *args, label=config['output_prefix'], **kwargs)
+
+        results = run_batch(command['channels'], [command['date']], library_content, on_result=report_result, engine_factory=engine_factory)
+        dataframes = [result['df'] for result in results if result['df'] is not None and not result['df'].empty]
+        if dataframes and not is_cancelled(job_id):
+            prefixes = sorted(CHANNEL_CONFIG[channel_name]['output_prefix'] for channel_name in command['channels'])
+            date_label = command['date'].replace('/', '-')
+            os.makedirs(command['output_dir'], exist_ok=True)
+            output_file = os.path.join(command['output_dir'], f"{'_'.join(prefixes)}_Schedule_Sheet_{date_label}.csv")
+            report = timeline_report(dataframes)
+            if report:
+                send({'event': 'output', 'job_id': job_id, 'data': f"\n{report}\n"})
+            with open(output_file, 'w', newline='', encoding='utf-8') as f:
+                write_combined_schedule(dataframes, f)
+            send({'event': 'output', 'job_id': job_id, 'data': f"\nCombined schedule sheet saved to {output_file}!\n"})
+        elif not is_cancelled(job_id):
+            send({'event': 'output', 'job_id': job_id, 'data': "\nAll channels failed to process. No combined schedule sheet was created.\n"})
+    except Exception as e:
+        if not is_cancelled(job_id):
+            send({'event': 'output', 'job_id': job_id, 'data': f"\n[ERROR] {e}\n"})
+    send({'event': 'exit', 'job_id': job_id, 'code': 0 if output_file else 1, 'output_file': output_file})
+    with state_lock:
+        cancelled_jobs.discard(job_id)
+
+def main():
+    send({'event': 'ready', 'pid': os.getpid(), 'channels': list(CHANNEL_CONFIG.keys())})
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        command = json.loads(line)
+        if command['cmd'] == 'load_library':
+            threading.Thread(target=handle_load_library, args=(command,), daemon=True).start()
+        elif command['cmd'] == 'run':
+            threading.Thread(target=run_job, args=(command,), daemon=True).start()
+        elif command['cmd'] == 'batch':
+            threading.Thread(target=run_batch_job, args=(command,), daemon=True).start()
+        elif command['cmd'] == 'cancel':
+            with state_lock:
+                cancelled_jobs.add(command['job_id'])
+
+if __name__ == "__main__":
+    main()